@@ -0,0 +1,228 @@
+#
+# End to end ETL benchmark on a synthetic universe (N symbols x M years of daily OHLCV)
+# Runs fetch -> staging load -> upsert, reports wall time, rows/sec and peak python memory per stage
+# and compares against the saved baseline so regressions show up run over run.
+#
+# Needs a scratch Postgres (the SQL uses COPY / ON CONFLICT / unnest), add it to the creds yaml and pass its key:
+#   python -m ETL.benchmark_etl --creds-key austere-bench --symbols 10 100 1000 --years 1 5 30
+#   python -m ETL.benchmark_etl --creds-key austere-bench --update-baseline
+#
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+import zlib
+import numpy as np
+import pandas as pd
+import config
+import bin.database as database
+import bin.quote_source as quote_source
+import bin.fetch_scheduler as fetch_scheduler
+from ETL import load_dbo_symbol_quotes as etl
+from ETL import quote_downloader
+
+BASELINE_FILE = 'ETL/benchmark_baseline.json'
+# rows/sec below this fraction of the baseline is reported as a regression
+REGRESSION_TOLERANCE = 0.8
+# the synthetic source has no rate limit to respect, the fetch stage must not time the token bucket
+UNTHROTTLED_REQUESTS_PER_SEC = 1e9
+
+BENCH_SCHEMA_SQL = """
+CREATE SCHEMA IF NOT EXISTS dbo;
+CREATE TABLE IF NOT EXISTS dbo.symbols (
+    symbol varchar PRIMARY key, "type" varchar NULL, "subtype" varchar NULL, exchange varchar null,
+    category varchar NULL, description varchar NULL, "comment" varchar NULL, active varchar NULL
+);
+CREATE TABLE IF NOT EXISTS dbo.symbol_quotes (
+    id bigserial, symbol varchar not null, date date not null, open float NULL, high varchar NULL,
+    low varchar null, close varchar not null, adj_close varchar NULL, volume varchar null,
+    primary key (symbol,date)
+);
+CREATE TABLE IF NOT EXISTS dbo.symbol_quotes_staging (
+    symbol varchar not null, date varchar not null, open float NULL, high varchar NULL, low varchar null,
+    close varchar not null, adj_close varchar NULL, volume varchar null
+);
+CREATE TABLE IF NOT EXISTS dbo.symbol_load_state (
+    symbol varchar PRIMARY KEY, last_loaded_date date NULL, last_run_status varchar NOT NULL,
+    last_row_count int NOT NULL DEFAULT 0, updated_at timestamp NOT NULL DEFAULT now(),
+    data_version bigint NOT NULL DEFAULT 0, actions_loaded_at timestamp NULL
+);
+CREATE TABLE IF NOT EXISTS dbo.data_version (
+    name varchar PRIMARY KEY, version bigint NOT NULL, updated_at timestamp NOT NULL DEFAULT now()
+);
+TRUNCATE dbo.symbol_quotes, dbo.symbol_quotes_staging, dbo.symbol_load_state, dbo.symbols, dbo.data_version;
+"""
+
+
+class SyntheticSource(quote_source.QuoteSource):
+    """Deterministic random walk OHLCV per ticker, shaped like yf.download"""
+
+    def __init__(self, end_date):
+        self.end_date = pd.Timestamp(end_date)
+
+    def _bars(self, ticker, start, end):
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        dates = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), name='Date')
+        close = 50 * np.exp(np.cumsum(rng.normal(0, 0.015, len(dates))))
+        spread = np.abs(rng.normal(0, 0.01, len(dates)))
+        return pd.DataFrame({
+            'Adj Close': close,
+            'Close': close,
+            'High': close * (1 + spread),
+            'Low': close * (1 - spread),
+            'Open': close * (1 + rng.normal(0, 0.005, len(dates))),
+            'Volume': rng.integers(100000, 10000000, len(dates)),
+        }, index=dates)
+
+    def download(self, tickers, start=None, end=None, group_by='column', **kwargs):
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        frames = {t: self._bars(t, start, end or self.end_date) for t in tickers}
+        data = pd.concat(frames, axis=1, names=['Ticker', 'Price'])
+        if group_by != 'ticker':
+            data = data.swaplevel(0, 1, axis=1)
+        return data
+
+    def history(self, symbol, start=None, end=None, **kwargs):
+        return self._bars(symbol, start, end or self.end_date)
+
+    # the benchmark only loads quotes, no corporate actions / fundamentals
+    def dividends(self, symbol):
+        return pd.Series(dtype='float64', name='Dividends')
+
+    def splits(self, symbol):
+        return pd.Series(dtype='float64', name='Stock Splits')
+
+    def actions(self, symbol):
+        return pd.DataFrame(columns=['Dividends', 'Stock Splits'], dtype='float64')
+
+    def info(self, symbol):
+        return {}
+
+    def quarterly_financials(self, symbol):
+        return pd.DataFrame()
+
+
+def runStage(name, func, rows_of, reset=None):
+    """
+    Run one stage twice: timed with nothing else running, then again under tracemalloc for the peak memory
+    (tracemalloc slows allocation heavy pandas code several-fold, so it never runs in the timed pass).
+    reset() puts the tables back the way the stage found them between the passes (untimed).
+    Returns (result of the timed pass, metrics dict)
+    """
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    if reset is not None:
+        reset()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rows = rows_of(result)
+    return result, {
+        'stage': name,
+        'seconds': round(seconds, 3),
+        'rows': rows,
+        'rows_per_sec': round(rows / seconds, 1) if seconds > 0 else None,
+        'peak_mem_mb': round(peak / 2**20, 1),
+    }
+
+
+def benchScheduler():
+    # production download concurrency and retries, without the request rate cap
+    return fetch_scheduler.FetchScheduler(rate=UNTHROTTLED_REQUESTS_PER_SEC, max_concurrency=quote_downloader.MAX_WORKERS,
+                                          max_retries=quote_downloader.MAX_RETRIES)
+
+
+def resetUpsertTarget():
+    # second upsert pass has to insert the batch again, not find it unchanged
+    with database.get_cursor() as cur:
+        cur.execute("TRUNCATE dbo.symbol_quotes, dbo.symbol_load_state, dbo.data_version")
+
+
+def runCase(n_symbols, years):
+    """Fresh tables, then the three ETL stages for one universe size"""
+    with database.get_cursor() as cur:
+        cur.execute(BENCH_SCHEMA_SQL)
+        symbols = ['SYN{:05d}'.format(i) for i in range(n_symbols)]
+        cur.execute("INSERT INTO dbo.symbols (symbol, active) select unnest(%s::varchar[]), '1'", (symbols,))
+
+    end_date = pd.Timestamp.today().normalize()
+    start_date = end_date - pd.DateOffset(days=int(years * 365.25))
+    quote_source.set_quote_source(SyntheticSource(end_date))
+    mySymbols = pd.DataFrame({'symbol': symbols, 'maxdate': start_date.strftime('%Y-%m-%d')})
+
+    results = []
+    (allData, failures), metrics = runStage(
+        'fetch', lambda: quote_downloader.downloadSymbolQuotes(mySymbols, scheduler=benchScheduler()), lambda r: len(r[0]))
+    results.append(metrics)
+    n_rows = len(allData)
+    # the staging load reshapes its input in place, each pass gets its own copy (made outside the timing)
+    stagingInputs = [allData.copy(), allData.copy()]
+    _, metrics = runStage('staging_load', lambda: etl.loadQuotesToStaging(stagingInputs.pop()), lambda r: n_rows)
+    results.append(metrics)
+    _, metrics = runStage('upsert', lambda: etl.upsertToSymbolQuotesFromStaging(failures), lambda r: n_rows,
+                          reset=resetUpsertTarget)
+    results.append(metrics)
+    for metrics in results:
+        metrics.update({'symbols': n_symbols, 'years': years})
+    return results
+
+
+def caseKey(metrics):
+    return '{symbols}x{years}y:{stage}'.format(**metrics)
+
+
+def loadBaseline():
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE, 'r') as f:
+        return json.load(f)
+
+
+def compareToBaseline(results, baseline):
+    """Adds baseline rows/sec and a regression flag to every result"""
+    for metrics in results:
+        base = baseline.get(caseKey(metrics))
+        metrics['baseline_rows_per_sec'] = base['rows_per_sec'] if base else None
+        metrics['regression'] = bool(
+            base and metrics['rows_per_sec'] is not None
+            and metrics['rows_per_sec'] < base['rows_per_sec'] * REGRESSION_TOLERANCE
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End to end ETL benchmark on a synthetic universe')
+    parser.add_argument('--creds-key', required=True, help='creds yaml key of a scratch Postgres (tables are truncated)')
+    parser.add_argument('--symbols', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--years', type=float, nargs='+', default=[1, 5])
+    parser.add_argument('--update-baseline', action='store_true', help='save this run as the new baseline')
+    args = parser.parse_args()
+    if args.creds_key == 'austere-prod':
+        parser.error('refusing to benchmark against the production database')
+    config.db_creds_key = args.creds_key
+
+    results = []
+    for n_symbols in args.symbols:
+        for years in args.years:
+            print('Running {} symbols x {} years'.format(n_symbols, years))
+            results.extend(runCase(n_symbols, years))
+
+    report = pd.DataFrame(compareToBaseline(results, loadBaseline()))
+    print(report.to_string(index=False))
+    if report['regression'].any():
+        print('REGRESSION: rows/sec below {:.0%} of baseline for the rows flagged above'.format(REGRESSION_TOLERANCE))
+
+    if args.update_baseline:
+        baseline = loadBaseline()
+        baseline.update({caseKey(m): {k: m[k] for k in ['seconds', 'rows', 'rows_per_sec', 'peak_mem_mb']} for m in results})
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print('Baseline saved to ' + BASELINE_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#
+# Compare rows/sec of the staging load modes (COPY vs execute_batch)
+# Loads synthetic OHLCV frames into a scratch copy of dbo.symbol_quotes_staging
+# Needs a scratch Postgres with dbo.symbol_quotes_staging, add it to the creds yaml and pass its key
+# usage (from repo root): python -m ETL.benchmark_staging_load --creds-key austere-bench 10000 100000
+#
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import config
+import bin.database as database
+from ETL import load_dbo_symbol_quotes as etl
+
+BENCH_TABLE = 'dbo.symbol_quotes_staging_bench'
+
+
+def syntheticQuotes(n_rows, n_symbols=50, seed=0):
+    """Frame shaped like the downloader output: Date index, yfinance columns + symbol"""
+    rng = np.random.default_rng(seed)
+    days = int(np.ceil(n_rows / n_symbols))
+    dates = pd.bdate_range('1995-01-02', periods=days, name='Date')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n_symbols, days)), axis=1)).ravel()[:n_rows]
+    df = pd.DataFrame({
+        'Open': close * (1 + rng.normal(0, 0.002, n_rows)),
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Adj Close': close,
+        'Volume': rng.integers(100000, 10000000, n_rows),
+        'symbol': np.repeat(['SYM' + str(i) for i in range(n_symbols)], days)[:n_rows],
+    }, index=np.tile(dates, n_symbols)[:n_rows])
+    df.index.name = 'Date'
+    return df
+
+
+def timeLoad(df, mode):
+    start = time.perf_counter()
+    etl.loadQuotesToStaging(df.copy(), mode=mode, table=BENCH_TABLE)
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    with database.get_cursor() as cur:
+        cur.execute("CREATE TABLE IF NOT EXISTS {} (LIKE dbo.symbol_quotes_staging)".format(BENCH_TABLE))
+    try:
+        print('{:>10} {:>8} {:>10} {:>12}'.format('rows', 'mode', 'seconds', 'rows/sec'))
+        for n_rows in sizes:
+            df = syntheticQuotes(n_rows)
+            for mode in ['batch', 'copy']:
+                seconds = timeLoad(df, mode)
+                print('{:>10} {:>8} {:>10.2f} {:>12,.0f}'.format(n_rows, mode, seconds, n_rows / seconds))
+    finally:
+        with database.get_cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS {}".format(BENCH_TABLE))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Staging load rows/sec, COPY vs execute_batch')
+    parser.add_argument('--creds-key', required=True, help='creds yaml key of a scratch Postgres (a bench table is created/dropped)')
+    parser.add_argument('sizes', type=int, nargs='*', default=[10000, 100000])
+    args = parser.parse_args()
+    if args.creds_key == 'austere-prod':
+        parser.error('refusing to benchmark against the production database')
+    config.db_creds_key = args.creds_key
+    main(args.sizes)
@@ -0,0 +1,144 @@
+#
+# ETL for corporate actions: dividends and splits per symbol into dbo.symbol_dividends / dbo.symbol_splits
+# Yahoo always returns the full action history of a ticker, only rows on/after the stored watermark
+# (less a revision window, for late amount corrections) are pushed to the database.
+# Runs as the last stage of ETL/load_dbo_symbol_quotes.main, or on its own:
+#   python -m ETL.load_dbo_symbol_actions
+#
+
+import pandas as pd
+import bin.database as database
+import bin.data_version as data_version
+import bin.quote_source as quote_source
+from ETL import quote_downloader
+
+# rows this many days before the last stored ex_date are re-sent (amount revisions, late announcements)
+REVISION_DAYS = 30
+
+FAILURE_COLUMNS = ['symbol', 'error']
+
+# concurrent Ticker.actions calls, these do not go through the serialized yf.download
+MAX_WORKERS = 4
+
+
+def getActionWatermarks():
+    # last stored ex_date per symbol and action type, actions_loaded_at is null until the first load
+    query = """
+    select s.symbol, ls.actions_loaded_at,
+        (select max(d.ex_date) from dbo.symbol_dividends d where d.symbol = s.symbol) dividends_maxdate,
+        (select max(sp.ex_date) from dbo.symbol_splits sp where sp.symbol = s.symbol) splits_maxdate
+    from dbo.symbols s
+    LEFT JOIN dbo.symbol_load_state ls ON s.symbol = ls.symbol
+    """
+    return database.read_sql(query)
+
+
+def _actionSeries(actions, column):
+    # the non zero values of one column of a Ticker.actions frame
+    if actions is None or column not in actions.columns:
+        return None
+    series = actions[column]
+    return series[series != 0]
+
+
+def _actionRows(series, symbol, maxdate, loaded):
+    # (symbol, ex_date, value) rows of an action series on/after the revision cutoff (all rows on a first load)
+    if series is None or len(series) == 0:
+        return []
+    index = pd.DatetimeIndex(series.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    frame = pd.DataFrame({'ex_date': index.normalize(), 'value': series.to_numpy(dtype='float64')})
+    if loaded and maxdate is not None and not pd.isna(maxdate):
+        frame = frame[frame['ex_date'] >= pd.Timestamp(maxdate) - pd.Timedelta(days=REVISION_DAYS)]
+    # one row per ex_date (keep the last reported value)
+    frame = frame.drop_duplicates('ex_date', keep='last')
+    return [(symbol, d.date(), v) for d, v in zip(frame['ex_date'], frame['value'])]
+
+
+def downloadSymbolActions(watermarks, scheduler=None):
+    """Fetch dividends and splits for every symbol in watermarks (getActionWatermarks output) through the
+    fetch scheduler. Returns (dividendRows, splitRows, loadedSymbols, failures)
+    """
+    source = quote_source.get_quote_source()
+    scheduler = scheduler or quote_downloader.makeScheduler(MAX_WORKERS)
+    tasks = [tuple(row) for row in watermarks[['symbol', 'actions_loaded_at', 'dividends_maxdate', 'splits_maxdate']]
+             .itertuples(index=False)]
+
+    def fetch(task):
+        symbol, loadedAt, dividendsMaxdate, splitsMaxdate = task
+        loaded = loadedAt is not None and not pd.isna(loadedAt)
+        # one full history request per symbol, dividends and splits are both columns of it (0 = no event that day)
+        actions = source.actions(symbol)
+        dividends = _actionRows(_actionSeries(actions, 'Dividends'), symbol, dividendsMaxdate, loaded)
+        splits = _actionRows(_actionSeries(actions, 'Stock Splits'), symbol, splitsMaxdate, loaded)
+        return (symbol, dividends, splits), []
+
+    results, failedTasks = scheduler.run(tasks, fetch)
+    dividendRows = [row for _, dividends, _ in results for row in dividends]
+    splitRows = [row for _, _, splits in results for row in splits]
+    loadedSymbols = [symbol for symbol, _, _ in results]
+    failures = pd.DataFrame([{'symbol': task[0], 'error': error} for task, error in failedTasks], columns=FAILURE_COLUMNS)
+    return dividendRows, splitRows, loadedSymbols, failures
+
+
+# Set based upsert of one action table from arrays, existing rows are only rewritten when the value changed
+# Returns one row per inserted/changed action
+ACTION_UPSERT_SQL = """
+    INSERT INTO {table} (symbol, ex_date, {column}, updated_at)
+        select symbol, ex_date, value, now()
+        from unnest(%s::varchar[], %s::date[], %s::float[]) as batch(symbol, ex_date, value)
+        on conflict (symbol, ex_date)
+        do update set {column} = excluded.{column}, updated_at = excluded.updated_at
+        where {table}.{column} is distinct from excluded.{column}
+    returning symbol
+    ; """
+
+# Symbols without a quotes load yet get their state row here, with a null quote watermark
+ACTIONS_LOADED_SQL = """
+    INSERT INTO dbo.symbol_load_state (symbol, last_loaded_date, last_run_status, last_row_count, updated_at, actions_loaded_at)
+        select unnest(%s::varchar[]), null, 'pending', 0, now(), now()
+        on conflict (symbol) 
+        do update set 
+            actions_loaded_at = excluded.actions_loaded_at
+    ; """
+
+
+def upsertActions(cursor, rows, table, column):
+    # returns the number of inserted/changed rows
+    if not rows:
+        return 0
+    symbols, exDates, values = (list(col) for col in zip(*rows))
+    cursor.execute(ACTION_UPSERT_SQL.format(table=table, column=column), (symbols, exDates, values))
+    return len(cursor.fetchall())
+
+
+# Returns {'dividends': n, 'splits': n, 'data_version': n or None}, one transaction for both tables
+# A new actions data version is only published when some row actually changed
+def upsertSymbolActions(dividendRows, splitRows, loadedSymbols):
+    version = None
+    with database.get_cursor() as cursor:
+        dividends = upsertActions(cursor, dividendRows, 'dbo.symbol_dividends', 'amount')
+        splits = upsertActions(cursor, splitRows, 'dbo.symbol_splits', 'ratio')
+        if loadedSymbols:
+            cursor.execute(ACTIONS_LOADED_SQL, (loadedSymbols,))
+        if dividends or splits:
+            version = data_version.bump(cursor, data_version.ACTIONS)
+    return {'dividends': dividends, 'splits': splits, 'data_version': version}
+
+
+# RUN ALL
+def main():
+    watermarks = getActionWatermarks()
+    print('Fetching dividends/splits for ' + str(len(watermarks)) + ' symbols.')
+    dividendRows, splitRows, loadedSymbols, failures = downloadSymbolActions(watermarks)
+    if len(failures) > 0:
+        print(str(len(failures)) + ' symbols failed to load actions:')
+        print(failures.to_string(index=False))
+    counts = upsertSymbolActions(dividendRows, splitRows, loadedSymbols)
+    print('Upserted {dividends} dividend and {splits} split rows.'.format(**counts))
+    return counts
+
+
+if __name__ == "__main__":
+    main()
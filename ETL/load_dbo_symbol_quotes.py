@@ -10,113 +10,196 @@ import pandasql as ps
 import config
 import psycopg2
 import psycopg2.extras
-import yaml 
-
-# YAML FILE LOCATION: 
-with open(config.creds_filepath, "r") as yaml_file:
-    creds = yaml.safe_load(yaml_file)
+import io
+import bin.database as database
+import bin.data_version as data_version
+from ETL import quote_downloader
+from ETL import load_dbo_symbol_actions
 
 def getSymbolList():
-    # Establish a connection to the PostgreSQL database
-    conn = psycopg2.connect(
-    dbname=creds['austere-prod']['dbname'],
-    user=creds['austere-prod']['user'],
-    password=creds['austere-prod']['password'],
-    host=creds['austere-prod']['host'],
-    port=creds['austere-prod']['port']
-    )
-    # get symbols of interest and their max date in dbo.symbol_quotes 
+    # get symbols of interest and their last loaded date from dbo.symbol_load_state (one row per symbol)
     query = """
     /* get symbol dates for */
-    with maxdates as (
-        select symbol, max(date) maxdate 
-        from dbo.symbol_quotes
-        group by symbol 
-        )
-    select s.symbol, cast(coalesce(maxdates.maxdate, '1980-01-01') as varchar) maxdate 
+    select s.symbol, cast(coalesce(ls.last_loaded_date, '1980-01-01') as varchar) maxdate 
     from dbo.symbols s
-    LEFT JOIN maxdates ON s.symbol = maxdates.symbol 
+    LEFT JOIN dbo.symbol_load_state ls ON s.symbol = ls.symbol 
     """
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = database.read_sql(query)
     return df
 
 
 
 # Get Ticker data from yahoo finance 
-def getSymbolQuotes(mySymbols):
-    lastDate = str(datetime.now().strftime('%Y-%m-%d'))  
-    for i, symbol in enumerate(mySymbols['symbol']):  
-        print('Loading ' + symbol + ' data')
-        try: 
-            if i == 0:
-                allData = yf.download(symbol, mySymbols.iloc[i]['maxdate'], lastDate)
-                allData['symbol'] = symbol 
-            else:
-                tmpData = yf.download(symbol, mySymbols.iloc[i]['maxdate'], lastDate)
-                tmpData['symbol'] = symbol 
-                allData = pd.concat([allData,tmpData])
-        except Exception as e: 
-            print('Error with: ' + symbol)
-    return allData
+def getSymbolQuotes(mySymbols, on_batch=None, on_failed=None):
+    # Batched by maxdate, the tickers of a batch are fetched in parallel by yfinance, returns (allData, failures)
+    return quote_downloader.downloadSymbolQuotes(mySymbols, on_batch=on_batch, on_failed=on_failed)
+
 
+STAGING_TABLE = 'dbo.symbol_quotes_staging'
+STAGING_COLUMNS = ['symbol', 'date', 'open', 'high', 'low', 'close', 'adj_close', 'volume']
+
+def prepStagingFrame(df):
+    # Date index -> date column, 'Adj Close' -> adj_close etc.
+    df.reset_index(inplace=True)
+    df.columns = [col.lower().replace(' ', '_') for col in df.columns]
+    return df
+
+def copyFrameToTable(cur, df, table):
+    # Stream the frame through COPY FROM STDIN, csv is written straight from the columns (no row tuples)
+    buffer = io.StringIO()
+    df.to_csv(buffer, columns=STAGING_COLUMNS, index=False, header=False, na_rep='')
+    buffer.seek(0)
+    copy_stmt = "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(table, ",".join(STAGING_COLUMNS))
+    cur.copy_expert(copy_stmt, buffer)
+
+def executeBatchFrameToTable(cur, df, table):
+    # Original path: one INSERT per row through execute_batch
+    df_columns = list(df)
+    # create (col1,col2,...)
+    columns = ",".join(df_columns)
+    # create VALUES('%s', '%s",...) one '%s' per column
+    values = "VALUES({})".format(",".join(["%s" for _ in df_columns])) 
+    #create INSERT INTO table (columns) VALUES('%s',...)
+    insert_stmt = "INSERT INTO {} ({}) {}".format(table, columns, values)
+    psycopg2.extras.execute_batch(cur, insert_stmt, df.values)
 
 # Now port allData into a new pg table (dbo.symbol_quotes_staging) (this schema will copy the schame from allData)
-def loadQuotesToStaging(df):
-    conn = psycopg2.connect(
-        dbname=creds['austere-prod']['dbname'],
-        user=creds['austere-prod']['user'],
-        password=creds['austere-prod']['password'],
-        host=creds['austere-prod']['host'],
-        port=creds['austere-prod']['port']
-    )
-    # df is the dataframe
-    if len(df) > 0:
-        df.reset_index(inplace=True)
-        df.columns = [col.lower().replace(' ', '_') for col in df.columns]
-        df_columns = list(df)
-        # create (col1,col2,...)
-        columns = ",".join(df_columns)
-        # create VALUES('%s', '%s",...) one '%s' per column
-        values = "VALUES({})".format(",".join(["%s" for _ in df_columns])) 
-        #create INSERT INTO table (columns) VALUES('%s',...)
-        insert_stmt = "INSERT INTO {} ({}) {}".format('dbo.symbol_quotes_staging', columns, values)
-        cur = conn.cursor()
-        psycopg2.extras.execute_batch(cur, insert_stmt, df.values)
-        conn.commit()
-        cur.close()
-    else:
-        print('No new symbol data available.')
-
-def upsertToSymbolQuotesFromStaging():
-    conn = psycopg2.connect(
-        dbname=creds['austere-prod']['dbname'],
-        user=creds['austere-prod']['user'],
-        password=creds['austere-prod']['password'],
-        host=creds['austere-prod']['host'],
-        port=creds['austere-prod']['port']
-    )
-    sql = """
-        /* upsert from staging into main table */ 
+# Staging only ever holds the current run: it is truncated in the same transaction as the load
+# mode: 'copy' (COPY FROM STDIN, default) or 'batch' (execute_batch inserts)
+def loadQuotesToStaging(df, mode='copy', table=STAGING_TABLE):
+    with database.get_cursor() as cur:
+        cur.execute("TRUNCATE TABLE {}".format(table))
+        # df is the dataframe
+        if len(df) > 0:
+            df = prepStagingFrame(df)
+            # close is NOT NULL in staging: one null close would fail the whole COPY, skip those bars instead
+            missingClose = df['close'].isna()
+            if missingClose.any():
+                print('Skipping ' + str(int(missingClose.sum())) + ' rows without a close:')
+                print(df.loc[missingClose, ['symbol', 'date']].to_string(index=False))
+                df = df[~missingClose]
+            if mode == 'copy':
+                copyFrameToTable(cur, df, table)
+            elif mode == 'batch':
+                executeBatchFrameToTable(cur, df, table)
+            else:
+                raise ValueError("mode must be 'copy' or 'batch', got: " + str(mode))
+        else:
+            print('No new symbol data available.')
+
+# Watermarks for every symbol in the staging batch, written in the same transaction as the upsert
+LOAD_STATE_SQL = """
+    /* advance dbo.symbol_load_state from the current staging batch */
+    INSERT INTO dbo.symbol_load_state (symbol, last_loaded_date, last_run_status, last_row_count, updated_at)
+        select symbol, max(cast("date" as date)), 'success', count(*), now()
+        from dbo.symbol_quotes_staging 
+        group by symbol 
+        on conflict (symbol) 
+        do update set 
+            last_loaded_date = greatest(dbo.symbol_load_state.last_loaded_date, excluded.last_loaded_date),
+            last_run_status = excluded.last_run_status,
+            last_row_count = excluded.last_row_count,
+            updated_at = excluded.updated_at
+    ; """
+
+# Failed symbols keep their watermark, only the status/row count move
+LOAD_STATE_FAILED_SQL = """
+    INSERT INTO dbo.symbol_load_state (symbol, last_loaded_date, last_run_status, last_row_count, updated_at)
+        select unnest(%s::varchar[]), null, 'failed', 0, now()
+        on conflict (symbol) 
+        do update set 
+            last_run_status = excluded.last_run_status,
+            last_row_count = excluded.last_row_count,
+            updated_at = excluded.updated_at
+    ; """
+
+# Symbols whose rows changed get the newly published data version (pages reload only those)
+LOAD_STATE_VERSION_SQL = """
+    update dbo.symbol_load_state 
+    set data_version = %s 
+    where symbol = any(%s::varchar[])
+    ; """
+
+# Set based upsert of the current staging batch (staging is truncated per run)
+# Existing rows are only rewritten when a value actually changed (e.g. late adj_close corrections)
+# Returns inserted/updated/batch row counts and the symbols that changed
+UPSERT_SQL = """
+    /* upsert from staging into main table */ 
+    with batch as (
+        select distinct on (symbol, cast("date" as date)) 
+            symbol, cast("date" as date) date, "open", high, low, "close", adj_close, volume
+        from dbo.symbol_quotes_staging 
+        order by symbol, cast("date" as date)
+        ),
+    updated as (
+        update dbo.symbol_quotes sq 
+        set "open" = b."open", high = b.high, low = b.low, "close" = b."close", adj_close = b.adj_close, volume = b.volume
+        from batch b 
+        where sq.symbol = b.symbol and sq."date" = b."date"
+            and (sq."open", sq.high, sq.low, sq."close", sq.adj_close, sq.volume) 
+                is distinct from (b."open", b.high, b.low, b."close", b.adj_close, b.volume)
+        returning sq.symbol
+        ),
+    inserted as (
         INSERT INTO dbo.symbol_quotes (symbol, "date", "open", high, low, "close", adj_close, volume)
-            select symbol, cast("date" as date) date , "open", high, low, "close", adj_close, volume
-            from dbo.symbol_quotes_staging 
+            select b.symbol, b."date", b."open", b.high, b.low, b."close", b.adj_close, b.volume
+            from batch b 
+            where not exists (select 1 from dbo.symbol_quotes sq where sq.symbol = b.symbol and sq."date" = b."date")
             on conflict 
             do nothing 
-        ; """
-    cursor = conn.cursor()
-    cursor.execute(sql)
-    conn.commit()
+        returning symbol
+        )
+    select (select count(*) from inserted), (select count(*) from updated), (select count(*) from batch),
+        array(select symbol from inserted union select symbol from updated)
+    ; """
+
+# Returns {'inserted': n, 'updated': n, 'unchanged': n, 'data_version': n or None} for the staging batch
+# A new data version is only published (same transaction) when some row actually changed
+def upsertToSymbolQuotesFromStaging(failures=None):
+    version = None
+    with database.get_cursor() as cursor:
+        cursor.execute(UPSERT_SQL)
+        inserted, updated, batch_rows, changed = cursor.fetchone()
+        cursor.execute(LOAD_STATE_SQL)
+        if failures is not None and len(failures) > 0:
+            cursor.execute(LOAD_STATE_FAILED_SQL, (list(failures['symbol']),))
+        if changed:
+            version = data_version.bump(cursor, data_version.QUOTES)
+            cursor.execute(LOAD_STATE_VERSION_SQL, (version, changed))
+    return {'inserted': inserted, 'updated': updated, 'unchanged': batch_rows - inserted - updated,
+            'data_version': version}
 
 
 # RUN ALL 
-def main():
+# progress: optional bin.etl_runner.EtlProgress, updated as the run goes (background runs from ManageSymbols)
+def main(progress=None):
     mySymbols = getSymbolList()
-    allData = getSymbolQuotes(mySymbols)
+    if progress is not None:
+        progress.start_stage('fetching', symbols_total=len(mySymbols))
+    if progress is not None:
+        allData, failures = getSymbolQuotes(mySymbols, on_batch=progress.add_batch,
+                                            on_failed=lambda symbols: progress.add_errors(len(symbols)))
+    else:
+        allData, failures = getSymbolQuotes(mySymbols)
+    if len(failures) > 0:
+        print(str(len(failures)) + ' symbols failed to load:')
+        print(failures.to_string(index=False))
+    if progress is not None:
+        progress.set_errors(failures)
+        progress.start_stage('staging')
     print('Pushing data to staging table dbo.symbol_quotes_staging.')
     loadQuotesToStaging(allData)
+    if progress is not None:
+        progress.start_stage('upserting')
     print('Formatting/loading data into target table dbo.symbol_quotes.')
-    upsertToSymbolQuotesFromStaging()
+    counts = upsertToSymbolQuotesFromStaging(failures)
+    print('Inserted {inserted}, updated {updated}, unchanged {unchanged} rows.'.format(**counts))
+    if progress is not None:
+        progress.start_stage('actions')
+    # dividends/splits into dbo.symbol_dividends / dbo.symbol_splits, the quotes above are already committed
+    print('Loading dividends and splits.')
+    counts['actions'] = load_dbo_symbol_actions.main()
+    return counts
 
 # UPDATE THIS CODE TO USE EXISTING MAX DATES TO PULL INCREMENTAL DATA! :) 
 
@@ -0,0 +1,122 @@
+#
+# Batched, concurrent quote downloader for the ETL
+# Groups symbols that share the same maxdate watermark into multi-ticker yf.download calls
+# yf.download calls are serialized by the quote source (yfinance keeps per call state in module globals),
+# so batches run one at a time: the parallelism is yfinance's own threads fetching the tickers of a batch
+#
+
+import pandas as pd
+from datetime import datetime
+import bin.quote_source as quote_source
+import bin.fetch_scheduler as fetch_scheduler
+
+# batches in flight at once (1: more would only queue on the download lock), max tickers per call,
+# call rate and in-run retries per symbol
+MAX_WORKERS = 1
+BATCH_SIZE = 50
+REQUESTS_PER_SEC = 2.0
+MAX_RETRIES = 2
+
+FAILURE_COLUMNS = ['symbol', 'maxdate', 'error']
+
+
+def buildDownloadBatches(mySymbols, batch_size=BATCH_SIZE):
+    """Group symbols by maxdate watermark, split into lists of at most batch_size symbols.
+    Returns a list of (maxdate, [symbols]) tuples.
+    """
+    batches = []
+    for maxdate, group in mySymbols.groupby('maxdate', sort=True):
+        symbols = list(group['symbol'])
+        for i in range(0, len(symbols), batch_size):
+            batches.append((maxdate, symbols[i:i + batch_size]))
+    return batches
+
+
+def _splitBatchFrame(data, symbols):
+    """Split a multi-ticker yf.download result into one frame per symbol (with a symbol column)"""
+    frames = {}
+    if data is None or data.empty:
+        return frames
+    if not isinstance(data.columns, pd.MultiIndex) and len(symbols) != 1:
+        # no ticker level to tell the symbols apart: nothing in this batch can be attributed
+        return frames
+    for symbol in symbols:
+        if isinstance(data.columns, pd.MultiIndex):
+            if symbol not in data.columns.get_level_values(0):
+                continue
+            symbolData = data[symbol]
+        else:
+            # single ticker without a ticker level in the columns
+            symbolData = data
+        symbolData = symbolData.dropna(how='all')
+        if symbolData.empty:
+            continue
+        symbolData = symbolData.copy()
+        symbolData.columns.name = None
+        symbolData['symbol'] = symbol
+        frames[symbol] = symbolData
+    return frames
+
+
+def downloadBatch(symbols, maxdate, lastDate):
+    """Download one group of symbols sharing the same watermark.
+    Returns ({symbol: DataFrame}, [failure dicts])
+    """
+    source = quote_source.get_quote_source()
+    try:
+        data = source.download(symbols, start=maxdate, end=lastDate, group_by='ticker',
+                               auto_adjust=False, threads=True, progress=False)
+    except Exception as e:
+        return {}, [{'symbol': s, 'maxdate': maxdate, 'error': str(e)} for s in symbols]
+
+    frames = _splitBatchFrame(data, symbols)
+    errors = source.download_errors()
+    failures = [
+        {'symbol': s, 'maxdate': maxdate, 'error': errors.get(s, 'No data returned')}
+        for s in symbols if s not in frames
+    ]
+    return frames, failures
+
+
+def makeScheduler(max_workers=MAX_WORKERS):
+    """Default scheduler for ETL downloads (rate limited, adaptive concurrency, in-run retries)"""
+    return fetch_scheduler.FetchScheduler(rate=REQUESTS_PER_SEC, max_concurrency=max_workers,
+                                          max_retries=MAX_RETRIES)
+
+
+def downloadSymbolQuotes(mySymbols, max_workers=MAX_WORKERS, batch_size=BATCH_SIZE, scheduler=None, on_batch=None,
+                         on_failed=None):
+    """Download quotes for every symbol in mySymbols (columns: symbol, maxdate).
+    Batches run through the fetch scheduler, symbols that fail are retried on their own within the run,
+    results are concatenated once at the end.
+    on_batch(frames) is called with the per symbol frames of every finished batch (progress reporting),
+    on_failed(symbols) with the symbols of every task that ran out of retries.
+
+    Returns:
+        tuple: (allData, failures)
+            - allData: Date indexed quotes with a symbol column (empty frame if nothing loaded)
+            - failures: DataFrame with one row per symbol that still failed after retries (symbol, maxdate, error)
+    """
+    lastDate = str(datetime.now().strftime('%Y-%m-%d'))
+    tasks = [(maxdate, tuple(symbols)) for maxdate, symbols in buildDownloadBatches(mySymbols, batch_size)]
+    scheduler = scheduler or makeScheduler(max_workers)
+
+    def fetch(task):
+        maxdate, symbols = task
+        batchFrames, batchFailures = downloadBatch(list(symbols), maxdate, lastDate)
+        print('Loaded ' + str(len(batchFrames)) + '/' + str(len(symbols)) + ' symbols in batch')
+        if batchFailures and not batchFrames:
+            # whole call failed (throttled / network): raise so the scheduler backs off and retries it as one batch
+            raise RuntimeError(batchFailures[0]['error'])
+        # a few misses in a batch that loaded are retried on their own, not a throttle signal
+        retry = [((maxdate, (f['symbol'],)), f['error']) for f in batchFailures]
+        return list(batchFrames.values()), retry
+
+    onFailure = None if on_failed is None else (lambda task, error: on_failed(task[1]))
+    results, failedTasks = scheduler.run(tasks, fetch, on_result=on_batch, on_failure=onFailure)
+    frames = [frame for batchFrames in results for frame in batchFrames]
+    failures = [{'symbol': symbol, 'maxdate': maxdate, 'error': error}
+                for (maxdate, symbols), error in failedTasks for symbol in symbols]
+
+    allData = pd.concat(frames) if frames else pd.DataFrame()
+    return allData, pd.DataFrame(failures, columns=FAILURE_COLUMNS)
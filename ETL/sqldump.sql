@@ -41,7 +41,79 @@ CREATE TABLE dbo.symbol_quotes_staging (
 	adj_close varchar NULL,
 	volume varchar null
 );
-COMMENT ON TABLE dbo.symbol_quotes_staging IS 'staging table for dbo.symbol_quotes, volatile data.';
+COMMENT ON TABLE dbo.symbol_quotes_staging IS 'staging table for dbo.symbol_quotes, volatile data. truncated at the start of every ETL load.';
+
+
+-- drop table dbo.symbol_load_state
+CREATE TABLE dbo.symbol_load_state (
+	symbol varchar PRIMARY KEY,
+	last_loaded_date date NULL,
+	last_run_status varchar NOT NULL,
+	last_row_count int NOT NULL DEFAULT 0,
+	updated_at timestamp NOT NULL DEFAULT now(),
+	data_version bigint NOT NULL DEFAULT 0,
+	actions_loaded_at timestamp NULL
+);
+COMMENT ON TABLE dbo.symbol_load_state IS 'per symbol ETL watermark, replaces max(date) over dbo.symbol_quotes.';
+
+-- one time backfill from existing history 
+INSERT INTO dbo.symbol_load_state (symbol, last_loaded_date, last_run_status, last_row_count)
+	select symbol, max(date), 'backfill', count(*)
+	from dbo.symbol_quotes
+	group by symbol 
+	on conflict do nothing 
+;
+
+
+-- drop table dbo.etl_run_history
+CREATE TABLE dbo.etl_run_history (
+	run_id serial PRIMARY KEY,
+	started_at timestamp NOT NULL DEFAULT now(),
+	finished_at timestamp NULL,
+	status varchar NOT NULL,
+	symbols_total int NULL,
+	symbols_done int NULL,
+	rows_loaded int NULL,
+	rows_inserted int NULL,
+	rows_updated int NULL,
+	errors int NULL,
+	message varchar NULL
+);
+COMMENT ON TABLE dbo.etl_run_history IS 'one row per quote ETL run (bin/etl_runner.py).';
+
+
+-- drop table dbo.data_version
+CREATE TABLE dbo.data_version (
+	name varchar PRIMARY KEY,
+	version bigint NOT NULL,
+	updated_at timestamp NOT NULL DEFAULT now()
+);
+COMMENT ON TABLE dbo.data_version IS 'data version tokens, bumped on every change so page caches reload (bin/data_version.py).';
+-- existing installs
+-- ALTER TABLE dbo.symbol_load_state ADD COLUMN data_version bigint NOT NULL DEFAULT 0;
+
+
+-- drop table dbo.symbol_dividends
+CREATE TABLE dbo.symbol_dividends (
+	symbol varchar not null,
+	ex_date date not null,
+	amount float not null,
+	updated_at timestamp NOT NULL DEFAULT now(),
+	primary key (symbol, ex_date)
+);
+COMMENT ON TABLE dbo.symbol_dividends IS 'dividend history per symbol, loaded incrementally by ETL/load_dbo_symbol_actions.py.';
+
+-- drop table dbo.symbol_splits
+CREATE TABLE dbo.symbol_splits (
+	symbol varchar not null,
+	ex_date date not null,
+	ratio float not null,
+	updated_at timestamp NOT NULL DEFAULT now(),
+	primary key (symbol, ex_date)
+);
+COMMENT ON TABLE dbo.symbol_splits IS 'stock split history per symbol, loaded incrementally by ETL/load_dbo_symbol_actions.py.';
+-- existing installs
+-- ALTER TABLE dbo.symbol_load_state ADD COLUMN actions_loaded_at timestamp NULL;
 
 
 /* upsert from staging into main table */ 
@@ -9,16 +9,22 @@ import streamlit as st
 import yfinance as yf
 import matplotlib.pyplot as plt
 import pandas as pd 
+import numpy as np
 from datetime import datetime 
 import plotly.graph_objs as go
 import plotly 
 import plotly.express as px
 from datetime import date, timedelta
-import pandasql as ps 
-import psycopg2
-import yaml
 import config
-import duckdb 
+import bin.database as database
+import bin.data_version as data_version
+import bin.quote_cache as quote_cache
+import bin.indicators as indicators
+import bin.quote_index as quote_index
+import bin.downsample as downsample
+import bin.rolling_state as rolling_state
+import bin.memory_budget as memory_budget
+import bin.bollinger as bollinger
 
 # Page configurations 
 st.set_page_config(layout="wide")
@@ -49,109 +55,104 @@ def add_logo():
     )
 add_logo()
 
-# YAML FILE LOCATION: 
-with open(config.creds_filepath, "r") as yaml_file:
-    creds = yaml.safe_load(yaml_file)
+# Data version tokens published by the ETL / symbol edits (bin/data_version.py)
+# Polled at most once a minute, every cache below is keyed on them so new loads show up without a restart
+@st.cache_data(ttl=60, show_spinner=False)
+def getDataVersions():
+    return data_version.get_data_versions()
 
-# Get All Symbol data of interest # 
+versions = getDataVersions()
+
+# Pull new rows from the DB into the local parquet store (bin/quote_cache.py), once per quotes version
 @st.cache_data
-def getSymbolQuotes():
-    conn = psycopg2.connect(
-        dbname=creds['austere-prod']['dbname'],
-        user=creds['austere-prod']['user'],
-        password=creds['austere-prod']['password'],
-        host=creds['austere-prod']['host'],
-        port=creds['austere-prod']['port']
-        )
-    sql = """
-    SELECT sq.symbol as Symbol, sq."date" as Date, 
-    cast( sq."open" as float) as Open, 
-    cast(sq.high as float) as High, 
-    cast(sq.low as float) as Low, 
-    cast(sq."close" as float) as Close, 
-    cast(sq.volume as float) as Volume
-    FROM dbo.symbol_quotes sq
-    join dbo.symbols s on s.symbol = sq.symbol 
-        
-    """
-    df = pd.read_sql(sql, conn)
-    conn.close()
+def syncQuoteCache(quotes_version):
+    return quote_cache.sync_quote_cache()
+
+# Get Symbol data of interest, only the partitions/dates asked for # 
+def getSymbolQuotes(symbols=None, date_min=None, date_max=None):
+    df = quote_cache.read_quotes(symbols=symbols, columns=['date', 'open', 'high', 'low', 'close', 'volume'],
+                                 date_min=date_min, date_max=date_max)
     return df
 
-allData = getSymbolQuotes()
+# What the local store holds per symbol ({symbol: {'maxdate', 'data_version'}}), read once per quotes version
+@st.cache_data
+def getSymbolState(quotes_version):
+    return quote_cache.load_manifest()
 
 @st.cache_data
-def getSymbols():
-    conn = psycopg2.connect(
-        dbname=creds['austere-prod']['dbname'],
-        user=creds['austere-prod']['user'],
-        password=creds['austere-prod']['password'],
-        host=creds['austere-prod']['host'],
-        port=creds['austere-prod']['port']
-        )
+def getSymbols(symbols_version):
     sql = """
     select * from dbo.symbols 
     """
-    df = pd.read_sql(sql, conn)
-    conn.close()
+    df = database.read_sql(sql)
     return df
 
-Symbols = getSymbols()
+Symbols = getSymbols(versions[data_version.SYMBOLS])
 
 @st.cache_data
-def getWatchlistSymbols():
-    conn = psycopg2.connect(
-        dbname=creds['austere-prod']['dbname'],
-        user=creds['austere-prod']['user'],
-        password=creds['austere-prod']['password'],
-        host=creds['austere-prod']['host'],
-        port=creds['austere-prod']['port']
-        )
+def getWatchlistSymbols(symbols_version):
     sql = """
     select w2.shortname watchlist, w2.longname as desc, w.symbol 
     from dbo.watchlistsymbols w 
     left join dbo.watchlists w2 on w.watchlist_id = w2.id  
     """
-    df = pd.read_sql(sql, conn)
-    conn.close()
+    df = database.read_sql(sql)
     return df
 
-watchlistSymbols = getWatchlistSymbols()
-
-# Move Symbol to first column 
-column = allData.pop('symbol')
-allData.insert(0, column.name, column)
-
-# Create Custom Cols 
-allData['High-Low'] = allData['high'] - allData['low']  
-allData['DailyVolatility_Perc'] = (allData['high'] - allData['low']) * 100  / ((allData['high'] + allData['low'])/ 2 )
-allData['Close_lag'] = allData.groupby('symbol')['close'].shift(1)
-#allData['CloseChange_Perc'] = ( allData.groupby('symbol')['close'] - allData.groupby('symbol')['close'].shift(1) ) / allData.groupby('symbol')['close'].shift(1)
-
-# Transformations :(Close - lag(Close) over (partition by Symbol order by date) ) / lag(Close) over (partition by Symbol order by date) as CloseChange_Perc 
-sql = """
-select *,
-case when lag(Close) over (partition by Symbol order by Date) is not null 
-    then ( Close*1.0 - lag(Close) over (partition by Symbol order by Date) )*100 / lag(Close) over (partition by Symbol order by Date) end  as CloseChange_Perc 
-
-from allData
-"""
-allData = ps.sqldf(sql, locals())
-allData = allData.reset_index()
-
-# Create Customs SMA's
-allData['_5day_SMA'] = allData.groupby('symbol')['close'].transform(lambda x: x.rolling(window=5).mean())
-allData['_10day_SMA'] = allData.groupby('symbol')['close'].transform(lambda x: x.rolling(window=10).mean())
-allData['_30day_SMA'] = allData.groupby('symbol')['close'].transform(lambda x: x.rolling(window=30).mean())
-allData['_90day_SMA'] = allData.groupby('symbol')['close'].transform(lambda x: x.rolling(window=90).mean())
-allData['_360day_SMA'] = allData.groupby('symbol')['close'].transform(lambda x: x.rolling(window=360).mean())
-
-# Create Customs Volatility Measures 
-allData['_5day_DailyVolPercAvg'] = allData.groupby('symbol')['DailyVolatility_Perc'].transform(lambda x: x.rolling(window=5).mean())
-allData['_10day_DailyVolPercAvg'] = allData.groupby('symbol')['DailyVolatility_Perc'].transform(lambda x: x.rolling(window=10).mean())
-allData['_30day_DailyVolPercAvg'] = allData.groupby('symbol')['DailyVolatility_Perc'].transform(lambda x: x.rolling(window=30).mean())
-allData['_90day_DailyVolPercAvg'] = allData.groupby('symbol')['DailyVolatility_Perc'].transform(lambda x: x.rolling(window=90).mean())
-allData['_360day_DailyVolPercAvg'] = allData.groupby('symbol')['DailyVolatility_Perc'].transform(lambda x: x.rolling(window=360).mean())
+watchlistSymbols = getWatchlistSymbols(versions[data_version.SYMBOLS])
+
+quotes_version = versions[data_version.QUOTES]
+syncQuoteCache(quotes_version)
+symbolState = getSymbolState(quotes_version)
+
+def symbolVersions(symbols):
+    # cache key part: the data versions of just these symbols, so loads of unchanged symbols stay cached
+    return tuple((s, symbolState[s].get('data_version', 0)) for s in sorted(symbols) if s in symbolState)
+
+# Base dataset (lags, % change, daily volatility, see bin/indicators.py) for symbols (None = all) up to date_max.
+# Watchlist and dates are pushed into the parquet read, LOOKBACK_DAYS of history before date_min is kept
+# so rolling indicators computed on demand (indicators.compute) are complete at date_min.
+# Returned as a QuoteIndex ((symbol, date) sorted, typed dates, per symbol offsets, see bin/quote_index.py)
+# Cached per parameter set in one memory bounded LRU shared by every session (config.derived_cache_budget_mb):
+# treat it as read only, widgets only slice it. Compact layout: categorical symbol, config.home_float_dtype floats
+@st.cache_resource
+def getDatasetCache():
+    return memory_budget.DatasetCache(config.derived_cache_budget_mb)
+
+def getWindowData(symbols, date_min, date_max, symbol_versions):
+    def build():
+        read_from = None if date_min is None else date_min - timedelta(days=indicators.LOOKBACK_DAYS)
+        quotes = getSymbolQuotes(symbols, read_from, date_max)
+        return quote_index.QuoteIndex(indicators.build_home_base(quotes, float_dtype=config.home_float_dtype))
+    key = ('window', symbols, date_min, date_max, symbol_versions)
+    with st.spinner('Loading quotes...'):
+        return getDatasetCache().get_or_build(key, build)
+
+# Just the date_min <= date <= date_max rows of getWindowData
+def getWindowView(symbols, date_min, date_max, symbol_versions):
+    def build():
+        df = getWindowData(symbols, date_min, date_max, symbol_versions).slice(date_min=date_min).reset_index(drop=True)
+        df['index'] = np.arange(len(df), dtype='int32')
+        return quote_index.QuoteIndex(df)
+    return getDatasetCache().get_or_build(('window_view', symbols, date_min, date_max, symbol_versions), build)
+
+# Bollinger bands of every symbol in a getWindowData dataset, one vectorized pass per window size
+def getBollinger(window_params, window):
+    build = lambda: bollinger.bands(getWindowData(*window_params), window)
+    return getDatasetCache().get_or_build(('bollinger',) + tuple(window_params) + (window,), build)
+
+# Indicators each view asks the registry for (bin/indicators.py), nothing else is computed
+SMA_CHART_INDICATORS = [('sma', {'window': w}) for w in [5, 10, 30, 90]]
+VOL_CHART_INDICATORS = [('rolling_vol', {'window': w}) for w in [5, 30, 90, 360]]
+
+# Latest row per symbol for the profile table, maintained incrementally on every sync (bin/rolling_state.py)
+@st.cache_resource(max_entries=8)
+def getLatestRows(symbols, symbol_versions):
+    latest = rolling_state.read_latest(symbols)
+    latest = latest[['symbol', 'close', '_5day_SMA', '_30day_SMA', '_360day_SMA', '_5day_DailyVolPercAvg',
+                     '_30day_DailyVolPercAvg', '_360day_DailyVolPercAvg', 'date']]
+    latest = latest.assign(date=pd.to_datetime(latest['date']).dt.date)
+    return latest.rename(columns={'date': 'maxdate'}).reset_index(drop=True)
 
 
 #---------------------------------------------#
@@ -162,82 +163,79 @@ titleCol1, titleCol2, titleCol3 = st.columns([2,1,2])
 titleCol1.title("Austere - Basic Analysis :diamond_shape_with_a_dot_inside:")
 myWatchlist = titleCol2.selectbox('Choose watchlist:', watchlistSymbols['watchlist'].unique())
 if myWatchlist != 'Default':
-    mySymbols = watchlistSymbols[watchlistSymbols['watchlist']==myWatchlist]['symbol']
-    allData = allData[allData['symbol'].isin(mySymbols)]
+    mySymbols = tuple(sorted(watchlistSymbols[watchlistSymbols['watchlist']==myWatchlist]['symbol'].unique()))
+    mySymbolVersions = symbolVersions(mySymbols)
+else:
+    mySymbols = None
+    mySymbolVersions = symbolVersions(symbolState)
+
+dateCol1, dateCol2 = titleCol3.columns(2)
+with dateCol1:
+    # Convert Date inputs 
+    date_ranges = ['10D','1M','3m', '6M', '1Y' ,'2Y', '3Y',  '4Y',   '5Y',   'MAX']
+    date_values = ['10', '30','90', '180','365','730','1095','1460' ,'1825','99999']
+    date_back = st.selectbox('Choose date range:', date_ranges, index=4)
+    numdays = date_values[date_ranges.index(date_back)]
+    date_min = date.today() - timedelta(days = int(numdays) )
+with dateCol2:
+    date_max = st.date_input("Max Date")
+
+topData = getLatestRows(mySymbols, mySymbolVersions)
+# Watchlist symbols within the chosen date range only
+allIndex = getWindowView(mySymbols, date_min, date_max, mySymbolVersions)
+allData = allIndex.frame
 
 
 st.write('### Sorted Symbol Profiles')
 
-# Show top KPI's 
+# Show top KPI's (latest row per symbol, precomputed per data version)
 def getTopData():
-    con = duckdb.connect(database=':memory:')
-    allDataTmp = allData 
-    con.register('allDataTmp', allData)
-    sql = """
-        SELECT 
-        a.symbol, a.close, _5day_SMA, _30day_SMA, _360day_SMA, _5day_DailyVolPercAvg, 
-        _30day_DailyVolPercAvg, _360day_DailyVolPercAvg, keys.maxdate
-        FROM allData a
-        INNER JOIN (
-            select symbol, max(date) maxdate
-            from allDataTmp 
-            group by symbol 
-            ) keys on a.symbol = keys.symbol 
-            and a.date = keys.maxdate
-        """
-    topData = con.execute(sql).fetchdf()
     st.dataframe(topData, hide_index=True)
 
 getTopData()
 
 
+# Long ranges are LTTB downsampled to config.chart_max_points per trace before they go to the browser
+full_resolution = st.sidebar.checkbox('Full resolution charts', value=False)
+chart_max_points = None if full_resolution else config.chart_max_points
+
+def lineTrace(x, y, **kwargs):
+    x, y = downsample.lttb(x, y, chart_max_points)
+    return go.Scatter(x=x, y=y, **kwargs)
+
+
 #---------------------------------------#
 #---------- Compare Symbols ------------#
 #---------------------------------------# 
 st.write('### Compare Symbol History ')  
 
 # Data Prep and filters
-col1,col2,col3,col4 = st.columns(4) 
+col1,col2 = st.columns(2) 
 with col1:
     compare_symbols = st.multiselect('Filter symbols', Symbols['symbol'])
     if len(compare_symbols) <= 0:
         comparedf = allData 
     else:   
-        comparedf = allData[allData['symbol'].isin(compare_symbols)]
-with col2: 
-    # Convert Date inputs 
-    date_ranges = ['10D','1M','3m', '6M', '1Y' ,'2Y', '3Y',  '4Y',   '5Y',   'MAX']
-    date_values = ['10', '30','90', '180','365','730','1095','1460' ,'1825','99999']
-    date_back = st.selectbox('Choose date range:', date_ranges, index=4)
-    numdays = date_values[date_ranges.index(date_back)]
-    date_min = datetime.now() - timedelta(days = int(numdays) )
-    date_min = date_min.strftime('%Y-%m-%d')
-with col3:
-    date_max = st.date_input("Max Date")
-with col4:
+        comparedf = allIndex.slice(compare_symbols)
+with col2:
     alldata_cols = list(allData.columns)
     inspect_column = st.selectbox("Inspect distribution", allData.columns,index = alldata_cols.index('DailyVolatility_Perc') ) 
 
-# Apply filters 
-comparedf = comparedf[comparedf['date'].astype(str) >= str(date_min)]
-comparedf = comparedf[comparedf['date'].astype(str) <= str(date_max)]
+#comparedf['CloseChange_Perc_cum'] = comparedf.groupby('symbol')['CloseChange_Perc'].cumsum()  
+# Close*100 / first_value(Close) over (partition by Symbol order by Date), rows are already sorted by (symbol, date)
+# symbol back to plain strings for plotly (the cached categorical knows every watchlist symbol)
+comparedf = comparedf.assign(
+    CloseChange_Perc_cum=comparedf['close'] * 100 / comparedf.groupby('symbol', observed=True)['close'].transform('first'),
+    symbol=comparedf['symbol'].astype(str))
 
 col1_compare, col2_compare, col3_compare = st.columns(3)
 with col1_compare:
-    comparefig = px.line(comparedf, x=comparedf['date'], y=comparedf['close'], color=comparedf['symbol'], title="Close by Date")
+    chartdf = downsample.downsample_frame(comparedf, 'date', 'close', by='symbol', max_points=chart_max_points)
+    comparefig = px.line(chartdf, x=chartdf['date'], y=chartdf['close'], color=chartdf['symbol'], title="Close by Date")
     st.plotly_chart(comparefig,sharing="streamlit",use_container_width=True)
 with col2_compare:
-    #comparedf['CloseChange_Perc_cum'] = comparedf.groupby('symbol')['CloseChange_Perc'].cumsum()  
-    #comparedf['CloseChange_Perc_cum'] = comparedf.groupby('symbol')['close'] / comparedf.groupby('symbol')['close'].first()
-    # Transformations :(Close - lag(Close) over (partition by Symbol order by date) ) / lag(Close) over (partition by Symbol order by date) as CloseChange_Perc 
-    sql = """
-    select *,
-    Close*100 / first_value(Close) over (partition by Symbol order by Date) as CloseChange_Perc_cum
-    from comparedf
-    """
-    comparedf = ps.sqldf(sql, locals())
-
-    comparefig_perc = px.line(comparedf, x=comparedf['date'], y=comparedf['CloseChange_Perc_cum'], color=comparedf['symbol'], title="% Since Origin")
+    chartdf = downsample.downsample_frame(comparedf, 'date', 'CloseChange_Perc_cum', by='symbol', max_points=chart_max_points)
+    comparefig_perc = px.line(chartdf, x=chartdf['date'], y=chartdf['CloseChange_Perc_cum'], color=chartdf['symbol'], title="% Since Origin")
     st.plotly_chart(comparefig_perc, sharing="streamlit", use_container_width=True)
 with col3_compare:
     fig_box = px.box(comparedf, x=inspect_column, color="symbol",title="Vol Dist ["+inspect_column+"]")
@@ -253,19 +251,26 @@ symbol = st.selectbox(
     (Symbols['symbol'])
         )
 
-# Apply filters 
-plotdata = allData[allData['symbol'] == symbol]
-plotdata = plotdata[plotdata['date'].astype(str) >= str(date_min)]
-plotdata = plotdata[plotdata['date'].astype(str) <= str(date_max)]
+# Apply filters: the loaded watchlist window, or its own small cached load when the symbol isn't in the watchlist
+plotVersions = symbolVersions([symbol])
+symbolParams = (mySymbols, date_min, date_max, mySymbolVersions)
+symbolIndex = getWindowData(*symbolParams)
+if symbol not in symbolIndex:
+    symbolParams = ((symbol,), date_min, date_max, plotVersions)
+    symbolIndex = getWindowData(*symbolParams)
+# SMA and volatility averages for just this symbol (memoized per symbol + data version, within the memory budget)
+plotdata = indicators.compute(symbolIndex, SMA_CHART_INDICATORS + VOL_CHART_INDICATORS, [symbol],
+                              date_min, date_max, dict(plotVersions), cache=getDatasetCache())
+plotdata = plotdata.assign(symbol=plotdata['symbol'].astype(str))
 
 col1_charts, col2_charts, col3_charts = st.columns(3) 
 with col1_charts:
     #-- Construct SMA Plot Lne Charts --# 
-    line0 = go.Scatter(x=plotdata['date'], y=plotdata['close'], mode='lines', name='close',line=dict(width=2))
-    line1 = go.Scatter(x=plotdata['date'], y=plotdata['_5day_SMA'], mode='lines', name='5day_SMA',line=dict(width=1))
-    line2 = go.Scatter(x=plotdata['date'], y=plotdata['_10day_SMA'], mode='lines', name='10day_SMA',line=dict(width=1))
-    line3 = go.Scatter(x=plotdata['date'], y=plotdata['_30day_SMA'], mode='lines', name='30day_SMA',line=dict(width=1))
-    line4 = go.Scatter(x=plotdata['date'], y=plotdata['_90day_SMA'], mode='lines', name='90day_SMA',line=dict(width=1))
+    line0 = lineTrace(plotdata['date'], plotdata['close'], mode='lines', name='close',line=dict(width=2))
+    line1 = lineTrace(plotdata['date'], plotdata['_5day_SMA'], mode='lines', name='5day_SMA',line=dict(width=1))
+    line2 = lineTrace(plotdata['date'], plotdata['_10day_SMA'], mode='lines', name='10day_SMA',line=dict(width=1))
+    line3 = lineTrace(plotdata['date'], plotdata['_30day_SMA'], mode='lines', name='30day_SMA',line=dict(width=1))
+    line4 = lineTrace(plotdata['date'], plotdata['_90day_SMA'], mode='lines', name='90day_SMA',line=dict(width=1))
 
     lines = [line0, line1, line2, line3, line4]
     layout = go.Layout(title='$' + symbol + " Line Charts",
@@ -277,11 +282,11 @@ with col1_charts:
 
 with col2_charts:
     #-- Construct Volatility Plots Lne Charts --# 
-    linebase = go.Scatter(x=plotdata['date'], y=plotdata['DailyVolatility_Perc'], mode='lines', name='DailyVolatility_Perc',line=dict(width=1))
-    line0 = go.Scatter(x=plotdata['date'], y=plotdata['_5day_DailyVolPercAvg'], mode='lines', name='5day_DailyVolPercAvg',line=dict(width=1))
-    line1 = go.Scatter(x=plotdata['date'], y=plotdata['_30day_DailyVolPercAvg'], mode='lines', name='30day_DailyVolPercAvg',line=dict(width=1))
-    line2 = go.Scatter(x=plotdata['date'], y=plotdata['_90day_DailyVolPercAvg'], mode='lines', name='90day_DailyVolPercAvg',line=dict(width=1))
-    line3 = go.Scatter(x=plotdata['date'], y=plotdata['_360day_DailyVolPercAvg'], mode='lines', name='360day_DailyVolPercAvg',line=dict(width=1))
+    linebase = lineTrace(plotdata['date'], plotdata['DailyVolatility_Perc'], mode='lines', name='DailyVolatility_Perc',line=dict(width=1))
+    line0 = lineTrace(plotdata['date'], plotdata['_5day_DailyVolPercAvg'], mode='lines', name='5day_DailyVolPercAvg',line=dict(width=1))
+    line1 = lineTrace(plotdata['date'], plotdata['_30day_DailyVolPercAvg'], mode='lines', name='30day_DailyVolPercAvg',line=dict(width=1))
+    line2 = lineTrace(plotdata['date'], plotdata['_90day_DailyVolPercAvg'], mode='lines', name='90day_DailyVolPercAvg',line=dict(width=1))
+    line3 = lineTrace(plotdata['date'], plotdata['_360day_DailyVolPercAvg'], mode='lines', name='360day_DailyVolPercAvg',line=dict(width=1))
 
     lines = [linebase, line0, line1, line2, line3]
     # Create layout
@@ -303,19 +308,15 @@ col1_charts1, col1_charts2 = st.columns(2)
 # BOLLINGER # 
 with col1_charts1:
     # Calculate rolling mean and standard deviation
-    window_size = st.slider('Window Size', 0,40,20)  # You can adjust this window size as needed
-    rolling_mean = plotdata['close'].rolling(window=window_size).mean()
-    rolling_std = plotdata['close'].rolling(window=window_size).std()
-
-    # Compute upper and lower Bollinger Bands
-    upper_band = rolling_mean + (2 * rolling_std)
-    lower_band = rolling_mean - (2 * rolling_std)
+    window_size = st.slider('Window Size', 2,40,20)  # You can adjust this window size as needed (std needs 2+ rows)
+    # Rolling mean +/- 2 standard deviations for every loaded symbol, cached per window (bin/bollinger.py)
+    symbolBands = bollinger.symbol_bands(symbolIndex, getBollinger(symbolParams, window_size), symbol, date_min, date_max)
 
     # Create traces for the plot
-    trace_close = go.Scatter(x=plotdata['date'], y=plotdata['close'], mode='lines', name='Closing Price')
-    trace_mean = go.Scatter(x=plotdata['date'], y=rolling_mean, mode='lines', name='Rolling Mean')
-    trace_upper_band = go.Scatter(x=plotdata['date'], y=upper_band, mode='lines', name='Upper Bollinger Band', line=dict(dash='dash'))
-    trace_lower_band = go.Scatter(x=plotdata['date'], y=lower_band, mode='lines', name='Lower Bollinger Band', line=dict(dash='dash'))
+    trace_close = lineTrace(symbolBands['date'], symbolBands['close'], mode='lines', name='Closing Price')
+    trace_mean = lineTrace(symbolBands['date'], symbolBands['mid'], mode='lines', name='Rolling Mean')
+    trace_upper_band = lineTrace(symbolBands['date'], symbolBands['upper'], mode='lines', name='Upper Bollinger Band', line=dict(dash='dash'))
+    trace_lower_band = lineTrace(symbolBands['date'], symbolBands['lower'], mode='lines', name='Lower Bollinger Band', line=dict(dash='dash'))
 
     # Combine traces into a figure  
     layout = go.Layout(title='$' + symbol + ' Bollinger Bands',
@@ -324,8 +325,29 @@ with col1_charts1:
     fig = go.Figure(data=[trace_close, trace_mean, trace_upper_band, trace_lower_band], layout=layout)
     st.plotly_chart(fig,sharing="streamlit",use_container_width=True)
 
+# BOLLINGER SQUEEZE #
+with col1_charts2:
+    # Watchlist symbols whose band width is near its low of the last SQUEEZE_LOOKBACK rows (same window as the chart)
+    st.write('Bollinger squeeze ({} day bands, width in lowest {:.0%} of last {} rows)'.format(
+        window_size, bollinger.SQUEEZE_QUANTILE, bollinger.SQUEEZE_LOOKBACK))
+    squeeze = bollinger.squeeze_screen(getBollinger((mySymbols, date_min, date_max, mySymbolVersions), window_size))
+    only_squeeze = st.checkbox('Only symbols in a squeeze', value=True)
+    if only_squeeze:
+        squeeze = squeeze[squeeze['in_squeeze']]
+    squeeze = squeeze.assign(date=pd.to_datetime(squeeze['date']).dt.date)
+    st.dataframe(squeeze[['symbol', 'date', 'close', 'mid', 'upper', 'lower', 'bandwidth', 'bandwidth_pctile']],
+                 hide_index=True)
+
 
 # Display data from filters for drill down 
 showalldata = st.radio('Show All Data',['Hide Data','Show Data'])
 if showalldata=='Show Data':
     st.dataframe(plotdata)
+
+# What the cached derived datasets cost (budget: config.derived_cache_budget_mb)
+with st.expander('Memory'):
+    datasetCache = getDatasetCache()
+    st.write('{:.1f} MB of {} MB used, {} evictions'.format(
+        datasetCache.total_bytes() / 2**20, config.derived_cache_budget_mb, datasetCache.evictions))
+    st.dataframe(datasetCache.summary(), hide_index=True)
+    st.dataframe(datasetCache.report(), hide_index=True)
@@ -0,0 +1,60 @@
+#
+# Bollinger bands for every symbol of a loaded dataset in one vectorized pass per window
+# (bin/indicators.grouped_rolling_mean_std), plus a squeeze screen over the latest rows.
+# Pages cache bands() per (dataset, window) so slider moves and symbol switches are lookups.
+#
+
+import numpy as np
+import pandas as pd
+import bin.indicators as indicators
+
+# squeeze: latest band width in the lowest SQUEEZE_QUANTILE of its last SQUEEZE_LOOKBACK rows
+SQUEEZE_LOOKBACK = 120
+SQUEEZE_QUANTILE = 0.1
+
+
+def bands(index, window, k=2):
+    """
+    Bands for every row of a QuoteIndex (same row order as index.frame):
+    symbol, date, close, mid, upper, lower, bandwidth ((upper - lower) / mid)
+    """
+    frame = index.frame
+    codes, _, pos = indicators.segment_positions(frame['symbol'].to_numpy())
+    mid, std = indicators.grouped_rolling_mean_std(frame['close'].to_numpy(dtype='float64'), codes, pos, window)
+    dtype = frame['close'].dtype
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bandwidth = 2 * k * std / mid
+    return pd.DataFrame({
+        'symbol': frame['symbol'].to_numpy(),
+        'date': frame['date'].to_numpy(),
+        'close': frame['close'].to_numpy(),
+        'mid': mid.astype(dtype),
+        'upper': (mid + k * std).astype(dtype),
+        'lower': (mid - k * std).astype(dtype),
+        'bandwidth': bandwidth.astype(dtype),
+    }, index=frame.index)
+
+
+def symbol_bands(index, all_bands, symbol, date_min=None, date_max=None):
+    """One symbol's rows of bands() within the date window (a slice, no recompute)"""
+    start, stop = index.rows(symbol, date_min, date_max)
+    return all_bands.iloc[start:stop]
+
+
+def squeeze_screen(all_bands, lookback=SQUEEZE_LOOKBACK, quantile=SQUEEZE_QUANTILE):
+    """
+    Latest row per symbol with its band width percentile over the last `lookback` rows.
+    in_squeeze when the percentile is at or below `quantile`. Sorted tightest first.
+    """
+    valid = all_bands.dropna(subset=['bandwidth'])
+    recent = valid.groupby('symbol', sort=False, observed=True).tail(lookback)
+    latest = recent.groupby('symbol', sort=False, observed=True).tail(1).set_index('symbol')
+    current = recent['symbol'].map(latest['bandwidth']).to_numpy(dtype='float64')
+    at_or_below = pd.Series(recent['bandwidth'].to_numpy(dtype='float64') <= current, index=recent.index)
+    percentile = at_or_below.groupby(recent['symbol'].to_numpy(), sort=False).mean()
+    screen = latest.assign(bandwidth_pctile=percentile.reindex(latest.index).to_numpy(),
+                           rows=recent.groupby('symbol', sort=False, observed=True).size().reindex(latest.index).to_numpy())
+    screen['in_squeeze'] = (screen['bandwidth_pctile'] <= quantile) & (screen['rows'] >= lookback)
+    screen = screen.reset_index()
+    screen['symbol'] = screen['symbol'].astype(str)
+    return screen.sort_values('bandwidth_pctile', kind='stable').reset_index(drop=True)
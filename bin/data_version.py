@@ -0,0 +1,37 @@
+#
+# Data version token published by the ETL (and symbol edits) so page caches know when to reload
+# dbo.data_version holds one counter per dataset, bumped in the same transaction as the write
+#
+
+import bin.database as database
+
+# dbo.symbol_quotes (bumped by the ETL upsert when rows were inserted/updated)
+QUOTES = 'quotes'
+# dbo.symbols / dbo.watchlistsymbols (bumped by ManageSymbols edits)
+SYMBOLS = 'symbols'
+# dbo.symbol_dividends / dbo.symbol_splits (bumped by the ETL corporate action load)
+ACTIONS = 'actions'
+
+BUMP_SQL = """
+    INSERT INTO dbo.data_version (name, version, updated_at)
+        values (%s, 1, now())
+        on conflict (name)
+        do update set version = dbo.data_version.version + 1, updated_at = now()
+    returning version
+    ; """
+
+
+def bump(cursor, name=QUOTES):
+    """Increment the version inside the caller's transaction, returns the new version"""
+    cursor.execute(BUMP_SQL, (name,))
+    return cursor.fetchone()[0]
+
+
+def get_data_versions():
+    """{name: version} for every dataset, names never published read as 0"""
+    with database.get_cursor() as cursor:
+        cursor.execute("select name, version from dbo.data_version")
+        versions = dict(cursor.fetchall())
+    for name in [QUOTES, SYMBOLS, ACTIONS]:
+        versions.setdefault(name, 0)
+    return versions
@@ -0,0 +1,133 @@
+#
+# Shared Postgres data access for the pages and the ETL
+# Creds are read once per process and every connection comes from one pool
+#
+
+import threading
+import time
+from contextlib import contextmanager
+import pandas as pd
+import psycopg2
+import psycopg2.pool
+import yaml
+import config
+
+# Connections kept open / max connections handed out at once
+POOL_MIN_CONN = 1
+POOL_MAX_CONN = 10
+
+_pool = None
+_pool_lock = threading.Lock()
+# ThreadedConnectionPool raises when exhausted, the semaphore makes callers wait instead
+_slots = threading.BoundedSemaphore(POOL_MAX_CONN)
+
+_stats_lock = threading.Lock()
+_stats = {
+    'checkouts': 0,
+    'in_use': 0,
+    'peak_in_use': 0,
+    'waits': 0,
+    'total_wait_s': 0.0,
+    'max_wait_s': 0.0,
+}
+
+
+def load_creds(creds_key=None):
+    """Read the YAML creds file (only done once, when the pool is created)"""
+    with open(config.creds_filepath, "r") as yaml_file:
+        creds = yaml.safe_load(yaml_file)
+    return creds[creds_key or config.db_creds_key]
+
+
+def get_pool():
+    """Process wide connection pool, created on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                creds = load_creds()
+                _pool = psycopg2.pool.ThreadedConnectionPool(
+                    POOL_MIN_CONN, POOL_MAX_CONN,
+                    dbname=creds['dbname'],
+                    user=creds['user'],
+                    password=creds['password'],
+                    host=creds['host'],
+                    port=creds['port']
+                )
+    return _pool
+
+
+def _record_checkout(wait_s):
+    with _stats_lock:
+        _stats['checkouts'] += 1
+        _stats['in_use'] += 1
+        _stats['peak_in_use'] = max(_stats['peak_in_use'], _stats['in_use'])
+        _stats['total_wait_s'] += wait_s
+        _stats['max_wait_s'] = max(_stats['max_wait_s'], wait_s)
+        if wait_s > 0.001:
+            _stats['waits'] += 1
+
+
+def _record_checkin():
+    with _stats_lock:
+        _stats['in_use'] -= 1
+
+
+@contextmanager
+def get_connection():
+    """
+    Borrow a pooled connection. Commits when the block exits cleanly, rolls back on error,
+    and always hands the connection back to the pool.
+
+        with database.get_connection() as conn:
+            df = pd.read_sql(sql, conn)
+    """
+    pool = get_pool()
+    start = time.perf_counter()
+    _slots.acquire()
+    try:
+        conn = pool.getconn()
+    except Exception:
+        _slots.release()
+        raise
+    _record_checkout(time.perf_counter() - start)
+    broken = False
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+        raise
+    finally:
+        pool.putconn(conn, close=broken or conn.closed != 0)
+        _record_checkin()
+        _slots.release()
+
+
+@contextmanager
+def get_cursor():
+    """Pooled connection + cursor, same commit/rollback rules as get_connection"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+
+def read_sql(sql, params=None):
+    """pd.read_sql over a pooled connection"""
+    with get_connection() as conn:
+        return pd.read_sql(sql, conn, params=params)
+
+
+def pool_stats():
+    """Snapshot of pool usage and wait times"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['max_conn'] = POOL_MAX_CONN
+    stats['avg_wait_s'] = stats['total_wait_s'] / stats['checkouts'] if stats['checkouts'] else 0.0
+    return stats
@@ -0,0 +1,124 @@
+#
+# Distribution statistics for many series at once (box_plot_compare annotations, dividend batch screen)
+# Every series is one group of a single concatenated array: counts, means and stds come from grouped sums,
+# the Student's t quantities are one vectorized scipy call over all groups. Shapiro-Wilk has no batched
+# form in scipy and still runs per series.
+# Results are memoized per input hash, re-rendering a chart or re-sorting a screen does not recompute.
+#
+
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from scipy.stats import t, shapiro
+
+# sigma point multiples drawn by box_plot_compare
+SIGMA_MULTIPLES = [-3, -2, -1, 1, 2, 3]
+# minimum sample size for Shapiro-Wilk
+SHAPIRO_MIN_N = 3
+# memoized result sets kept (least recently used dropped first)
+MEMO_MAX_ENTRIES = 256
+
+STATS_COLUMNS = ['n', 'mean', 'std', 'sigma_std', 'std_err', 't_stat', 't_test_p', 'p_gt_zero', 'shapiro_p']
+
+_memo = OrderedDict()
+
+
+def _input_hash(keys, arrays):
+    digest = hashlib.sha1()
+    for key, values in zip(keys, arrays):
+        digest.update(repr(key).encode())
+        digest.update(len(values).to_bytes(8, 'little'))
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+def _shapiro_p(values):
+    if len(values) < SHAPIRO_MIN_N:
+        return np.nan
+    try:
+        return shapiro(values)[1]
+    except Exception:
+        return np.nan
+
+
+def _compute(keys, arrays):
+    lengths = np.array([len(values) for values in arrays], dtype='int64')
+    codes = np.repeat(np.arange(len(arrays)), lengths)
+    values = np.concatenate(arrays) if arrays else np.array([], dtype='float64')
+    groups = len(arrays)
+
+    n = lengths.astype('float64')
+    sums = np.bincount(codes, weights=values, minlength=groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(n > 0, sums / n, np.nan)
+        # sample std (ddof=1) from squared deviations around each group's mean
+        sq_dev = np.bincount(codes, weights=(values - mean[codes]) ** 2, minlength=groups)
+        std = np.where(n > 1, np.sqrt(sq_dev / (n - 1)), np.nan)
+        dof = n - 1
+        # sigma points use the sample std scaled by the t-distribution's sd, sqrt(dof / (dof - 2)), once dof > 2
+        sigma_std = np.where(dof > 2, std * np.sqrt(dof / (dof - 2)), std)
+        std_err = std / np.sqrt(n)
+        # one-sample t-test of mean == 0
+        t_stat = np.where(std_err > 0, mean / std_err, np.nan)
+        t_test_p = np.where(np.isnan(t_stat), np.nan, 2 * t.sf(np.abs(t_stat), np.maximum(dof, 1)))
+        # predictive P(X > 0): a single draw, so the std (not the standard error) scales the t-distribution
+        spread = (std > 0) & (n > 1)
+        p_gt_zero = np.where(spread, 1 - t.cdf(-mean / np.where(spread, std, 1), np.maximum(dof, 1)),
+                             np.where(mean > 0, 1.0, 0.0))
+
+    stats = pd.DataFrame({
+        'n': lengths,
+        'mean': mean,
+        'std': std,
+        'sigma_std': sigma_std,
+        'std_err': std_err,
+        't_stat': t_stat,
+        't_test_p': t_test_p,
+        'p_gt_zero': p_gt_zero,
+        'shapiro_p': [_shapiro_p(values) for values in arrays],
+    }, index=pd.Index(keys, tupleize_cols=False))
+    return stats
+
+
+def describe(series):
+    """
+    Statistics for every series in one pass.
+
+    Args:
+        series (dict): {key: values} with any hashable key (e.g. (symbol, metric)), values array-like, NaNs are dropped
+
+    Returns:
+        DataFrame indexed by key with STATS_COLUMNS (n, mean, std, sigma_std, std_err, t_stat, t_test_p,
+        p_gt_zero, shapiro_p). Callers must not modify it, the same frame is returned for the same input.
+    """
+    keys = list(series)
+    arrays = []
+    for key in keys:
+        values = np.asarray(series[key], dtype='float64').ravel()
+        arrays.append(np.ascontiguousarray(values[~np.isnan(values)]))
+    memo_key = _input_hash(keys, arrays)
+    stats = _memo.get(memo_key)
+    if stats is not None:
+        _memo.move_to_end(memo_key)
+        return stats
+    stats = _compute(keys, arrays)
+    _memo[memo_key] = stats
+    while len(_memo) > MEMO_MAX_ENTRIES:
+        _memo.popitem(last=False)
+    return stats
+
+
+def describe_columns(frames, columns):
+    """describe() over columns of several frames: {name: DataFrame} -> stats indexed by (name, column)"""
+    return describe({(name, column): frame[column].to_numpy(dtype='float64')
+                     for name, frame in frames.items() if frame is not None for column in columns})
+
+
+def sigma_points(stats_row):
+    """mean + k * sigma_std for k in SIGMA_MULTIPLES"""
+    return [stats_row['mean'] + k * stats_row['sigma_std'] for k in SIGMA_MULTIPLES]
+
+
+def clear_memo():
+    _memo.clear()
@@ -0,0 +1,57 @@
+#
+# Local dividend / price history for the dividend pages, read from the ETL tables
+# (dbo.symbol_dividends, dbo.symbol_splits, dbo.symbol_quotes), no Yahoo round trips.
+# Shapes match quote_source.dividends / history so callers can fall back to the live source.
+#
+
+import pandas as pd
+import bin.database as database
+
+
+def has_symbol(symbol):
+    """True when the ETL has loaded both quotes and corporate actions for symbol"""
+    sql = """
+    select 1 from dbo.symbol_load_state
+    where symbol = %s and last_loaded_date is not null and actions_loaded_at is not null
+    """
+    return len(database.read_sql(sql, params=(symbol,))) > 0
+
+
+def dividends(symbol, start=None, end=None):
+    """Dividend amounts indexed by (naive) ex-date, start/end inclusive"""
+    sql = """
+    select ex_date, amount from dbo.symbol_dividends
+    where symbol = %s and ex_date >= coalesce(%s, '-infinity'::date) and ex_date <= coalesce(%s, 'infinity'::date)
+    order by ex_date
+    """
+    df = database.read_sql(sql, params=(symbol, _as_date(start), _as_date(end)))
+    return pd.Series(df['amount'].to_numpy(dtype='float64'), index=pd.DatetimeIndex(df['ex_date'], name='Date'),
+                     name='Dividends')
+
+
+def splits(symbol, start=None, end=None):
+    """Split ratios indexed by (naive) ex-date, start/end inclusive"""
+    sql = """
+    select ex_date, ratio from dbo.symbol_splits
+    where symbol = %s and ex_date >= coalesce(%s, '-infinity'::date) and ex_date <= coalesce(%s, 'infinity'::date)
+    order by ex_date
+    """
+    df = database.read_sql(sql, params=(symbol, _as_date(start), _as_date(end)))
+    return pd.Series(df['ratio'].to_numpy(dtype='float64'), index=pd.DatetimeIndex(df['ex_date'], name='Date'),
+                     name='Stock Splits')
+
+
+def prices(symbol, start=None, end=None):
+    """Daily Open/Close (unadjusted, as loaded by the ETL) indexed by naive date, end exclusive like history()"""
+    sql = """
+    select "date", "open", cast("close" as float) "close" from dbo.symbol_quotes
+    where symbol = %s and "date" >= coalesce(%s, '-infinity'::date) and "date" < coalesce(%s, 'infinity'::date)
+    order by "date"
+    """
+    df = database.read_sql(sql, params=(symbol, _as_date(start), _as_date(end)))
+    return pd.DataFrame({'Open': df['open'].to_numpy(dtype='float64'), 'Close': df['close'].to_numpy(dtype='float64')},
+                        index=pd.DatetimeIndex(df['date'], name='Date'))
+
+
+def _as_date(value):
+    return None if value is None else pd.Timestamp(value).date()
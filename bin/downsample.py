@@ -0,0 +1,72 @@
+#
+# Shape preserving downsampling for plotly line traces (Largest-Triangle-Three-Buckets)
+# Keeps first/last points and, per bucket, the point forming the largest triangle with its neighbours,
+# so peaks, troughs and gaps survive while the browser gets at most max_points per trace
+#
+
+import numpy as np
+import pandas as pd
+
+
+def _as_float(x):
+    x = pd.Index(x)
+    if isinstance(x, pd.DatetimeIndex):
+        return x.asi8.astype('float64')
+    return x.to_numpy(dtype='float64')
+
+
+def lttb_indices(x, y, max_points):
+    """Positions of the points LTTB keeps out of (x, y), x ascending, no NaNs"""
+    n = len(y)
+    if max_points is None or n <= max_points or max_points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    # n - 2 inner points split into max_points - 2 buckets
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        start, stop = edges[i], edges[i + 1]
+        # next bucket's average is the third triangle corner (last point for the final bucket)
+        next_start, next_stop = stop, edges[i + 2] if i + 2 < len(edges) else n
+        cx = x[next_start:next_stop].mean()
+        cy = y[next_start:next_stop].mean()
+        area = np.abs((x[a] - cx) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def lttb(x, y, max_points):
+    """
+    Downsample one trace. NaN y values are dropped first (leading rolling window gaps).
+    Returns (x index, y array), unchanged when already within max_points (None = full resolution).
+    """
+    x = pd.Index(x)
+    y = np.asarray(y, dtype='float64')
+    if max_points is None or len(y) <= max_points:
+        return x, y
+    valid = ~np.isnan(y)
+    x, y = x[valid], y[valid]
+    keep = lttb_indices(_as_float(x), y, max_points)
+    return x[keep], y[keep]
+
+
+def downsample_frame(df, x, y, by=None, max_points=None):
+    """
+    Rows of df kept by LTTB on (x, y), separately per `by` group (one trace per group, e.g. px.line color=).
+    Rows must be sorted by x within each group. Returns df itself when nothing needs dropping.
+    """
+    if max_points is None or len(df) <= max_points:
+        return df
+    # positional rows of every group
+    groups = [np.arange(len(df))] if by is None else list(df.groupby(by, sort=False, observed=True).indices.values())
+    xs = df[x].to_numpy()
+    ys = df[y].to_numpy(dtype='float64')
+    positions = []
+    for rows in groups:
+        rows = rows[~np.isnan(ys[rows])]
+        positions.append(rows[lttb_indices(_as_float(xs[rows]), ys[rows], max_points)])
+    return df.iloc[np.sort(np.concatenate(positions))] if positions else df
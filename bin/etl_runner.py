@@ -0,0 +1,166 @@
+#
+# Background runner for the quote ETL (ETL/load_dbo_symbol_quotes.main)
+# One active run at a time: a process lock plus a Postgres advisory lock (covers other app processes)
+# Progress lives in memory for the page to poll, every run is recorded in dbo.etl_run_history
+#
+
+import threading
+import time
+import traceback
+import bin.database as database
+
+# pg_advisory_lock key for the quote ETL
+ETL_LOCK_ID = 860210
+
+
+class EtlProgress:
+    """Live progress of a run, safe to update from the ETL worker threads"""
+
+    def __init__(self, run_id):
+        self._lock = threading.Lock()
+        self.run_id = run_id
+        self.stage = 'starting'
+        self.status = 'running'
+        self.started = time.time()
+        self.finished = None
+        self.symbols_total = 0
+        self.symbols_done = 0
+        self.rows_loaded = 0
+        self.errors = 0
+        self.message = ''
+
+    def start_stage(self, stage, symbols_total=None):
+        with self._lock:
+            self.stage = stage
+            if symbols_total is not None:
+                self.symbols_total = symbols_total
+
+    def add_batch(self, frames):
+        with self._lock:
+            self.symbols_done += len(frames)
+            self.rows_loaded += sum(len(frame) for frame in frames)
+
+    def add_errors(self, count):
+        # symbols given up on during the fetch, reported while the stage is still running
+        with self._lock:
+            self.errors += count
+
+    def set_errors(self, failures):
+        with self._lock:
+            self.errors = len(failures)
+
+    def finish(self, status, message=''):
+        with self._lock:
+            self.stage = 'done'
+            self.status = status
+            self.message = message
+            self.finished = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            snap = {k: v for k, v in self.__dict__.items() if not k.startswith('_')}
+        snap['elapsed_s'] = round((self.finished or time.time()) - self.started, 1)
+        return snap
+
+
+_run_lock = threading.Lock()
+_current = None
+
+
+def get_progress():
+    """Snapshot of the current (or last) run in this process, None if nothing ran yet"""
+    return None if _current is None else _current.snapshot()
+
+
+def is_running():
+    return _run_lock.locked()
+
+
+def _start_history(cursor):
+    # Runs left 'running' by a dead process can't still hold the advisory lock
+    cursor.execute("update dbo.etl_run_history set status = 'abandoned', finished_at = now() where status = 'running'")
+    cursor.execute("insert into dbo.etl_run_history (status) values ('running') returning run_id")
+    return cursor.fetchone()[0]
+
+
+def _finish_history(progress, counts=None):
+    sql = """
+    update dbo.etl_run_history
+    set finished_at = now(), status = %s, symbols_total = %s, symbols_done = %s, rows_loaded = %s,
+        rows_inserted = %s, rows_updated = %s, errors = %s, message = %s
+    where run_id = %s
+    """
+    counts = counts or {}
+    snap = progress.snapshot()
+    with database.get_cursor() as cursor:
+        cursor.execute(sql, (snap['status'], snap['symbols_total'], snap['symbols_done'], snap['rows_loaded'],
+                             counts.get('inserted'), counts.get('updated'), snap['errors'],
+                             snap['message'][:2000], snap['run_id']))
+
+
+def _run(started):
+    """Worker thread: take the advisory lock on a held pooled connection, run the ETL, record the result"""
+    global _current
+    try:
+        with database.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("select pg_try_advisory_lock(%s)", (ETL_LOCK_ID,))
+                if not cursor.fetchone()[0]:
+                    # another process is loading
+                    started['run_id'] = None
+                    return
+            # from here on the session lock is held: whatever fails, it is released before the connection goes back
+            try:
+                with conn.cursor() as cursor:
+                    run_id = _start_history(cursor)
+                conn.commit()
+                progress = EtlProgress(run_id)
+                _current = progress
+                started['run_id'] = run_id
+                started['event'].set()
+                counts = None
+                try:
+                    from ETL import load_dbo_symbol_quotes
+                    counts = load_dbo_symbol_quotes.main(progress=progress)
+                    progress.finish('success')
+                except Exception as e:
+                    traceback.print_exc()
+                    progress.finish('failed', str(e))
+                _finish_history(progress, counts)
+            finally:
+                # a failed history insert leaves the transaction aborted, the session lock survives the rollback
+                conn.rollback()
+                with conn.cursor() as cursor:
+                    cursor.execute("select pg_advisory_unlock(%s)", (ETL_LOCK_ID,))
+    except Exception as e:
+        traceback.print_exc()
+        started['error'] = e
+    finally:
+        started['event'].set()
+        _run_lock.release()
+
+
+def start_run():
+    """
+    Start the ETL on a background thread.
+    Returns the new run_id, or None if a run is already active (here or in another process).
+    """
+    if not _run_lock.acquire(blocking=False):
+        return None
+    started = {'event': threading.Event(), 'run_id': None, 'error': None}
+    threading.Thread(target=_run, args=(started,), name='etl-run', daemon=True).start()
+    started['event'].wait()
+    if started['error'] is not None:
+        raise started['error']
+    return started['run_id']
+
+
+def get_run_history(limit=20):
+    sql = """
+    select run_id, started_at, finished_at, status, symbols_total, symbols_done, rows_loaded,
+        rows_inserted, rows_updated, errors, message
+    from dbo.etl_run_history
+    order by run_id desc
+    limit %s
+    """
+    return database.read_sql(sql, params=(limit,))
@@ -0,0 +1,171 @@
+#
+# Rate limit aware fetch scheduler for bulk Yahoo pulls (ETL and pages)
+#   - token bucket caps the request rate
+#   - concurrency adapts to what we see: halves on errors / slow calls, grows back by one on clean fast calls
+#     (latency is the call's own time, waits a fetch marks with waiting() are left out)
+#   - failed work goes to a retry queue within the same run, with exponential backoff + jitter
+#
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second with bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                sleep_s = (1 - self.tokens) / self.rate
+            time.sleep(sleep_s)
+
+
+_wait = threading.local()
+
+
+@contextmanager
+def waiting():
+    """Time spent in this block (e.g. queued on a shared lock) does not count towards the calling fetch's latency"""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        _wait.seconds = getattr(_wait, 'seconds', 0.0) + time.monotonic() - start
+
+
+def _timed(fetch, task):
+    # runs on the worker thread: (fetch result, latency without marked waits)
+    _wait.seconds = 0.0
+    start = time.monotonic()
+    result = fetch(task)
+    return result, time.monotonic() - start - _wait.seconds
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Exponential backoff with full jitter for retry number `attempt` (1, 2, ...)"""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class FetchScheduler:
+    """
+    Runs fetch(task) over many tasks on a bounded, adaptive worker pool.
+
+    fetch(task) returns (result, retry) where retry is a list of (task, error) pairs that should be
+    tried again (e.g. the symbols of a batch that failed). Raising retries the whole task.
+    Only a raised call counts as an error; per task retries (a few misses in a batch that otherwise loaded)
+    are not a throttle signal.
+
+    Args:
+        rate (float): max fetch calls started per second
+        max_concurrency (int): upper bound of calls in flight
+        min_concurrency (int): concurrency never drops below this
+        max_retries (int): retries per task before it is reported as failed
+        latency_target_s (float): calls slower than this count as a throttle signal (stats['slow'], not an error)
+        backoff_base_s / backoff_cap_s (float): retry backoff parameters
+    """
+
+    def __init__(self, rate=2.0, max_concurrency=8, min_concurrency=1, max_retries=3,
+                 latency_target_s=20.0, backoff_base_s=2.0, backoff_cap_s=60.0):
+        self.bucket = TokenBucket(rate)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.latency_target_s = latency_target_s
+        self.backoff_base_s = backoff_base_s
+        self.backoff_cap_s = backoff_cap_s
+        self.limit = max(min_concurrency, min(max_concurrency, 2))
+        self.stats = {'calls': 0, 'errors': 0, 'slow': 0, 'retries': 0, 'failed': 0, 'peak_concurrency': 0,
+                      'concurrency': self.limit}
+
+    def _on_success(self, latency):
+        if latency > self.latency_target_s:
+            self.stats['slow'] += 1
+            self._back_off()
+        elif self.limit < self.max_concurrency:
+            self.limit += 1
+
+    def _on_error(self):
+        self.stats['errors'] += 1
+        self._back_off()
+
+    def _back_off(self):
+        self.limit = max(self.min_concurrency, self.limit // 2)
+
+    def run(self, tasks, fetch, on_result=None, on_failure=None):
+        """
+        Fetch every task. Returns (results, failures), failures is a list of (task, error).
+        on_result(result) is called from the scheduling thread as each result arrives,
+        on_failure(task, error) as each task runs out of retries.
+        """
+        results, failures = [], []
+        counter = itertools.count()
+        # (ready_at, seq, attempt, task)
+        queue = [(0.0, next(counter), 0, task) for task in tasks]
+        heapq.heapify(queue)
+        in_flight = {}
+
+        def schedule_retry(task, attempt, error):
+            if attempt >= self.max_retries:
+                failures.append((task, error))
+                self.stats['failed'] += 1
+                if on_failure is not None:
+                    on_failure(task, error)
+                return
+            self.stats['retries'] += 1
+            delay = backoff_delay(attempt + 1, self.backoff_base_s, self.backoff_cap_s)
+            heapq.heappush(queue, (time.monotonic() + delay, next(counter), attempt + 1, task))
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            while queue or in_flight:
+                now = time.monotonic()
+                while queue and queue[0][0] <= now and len(in_flight) < self.limit:
+                    _, _, attempt, task = heapq.heappop(queue)
+                    self.bucket.acquire()
+                    future = executor.submit(_timed, fetch, task)
+                    in_flight[future] = (task, attempt)
+                    self.stats['calls'] += 1
+                    self.stats['peak_concurrency'] = max(self.stats['peak_concurrency'], len(in_flight))
+
+                timeout = None
+                if queue and len(in_flight) < self.limit:
+                    timeout = max(0.0, queue[0][0] - time.monotonic())
+                if not in_flight:
+                    time.sleep(timeout or 0)
+                    continue
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    task, attempt = in_flight.pop(future)
+                    try:
+                        (result, retry), latency = future.result()
+                    except Exception as e:
+                        self._on_error()
+                        schedule_retry(task, attempt, str(e))
+                        continue
+                    results.append(result)
+                    if on_result is not None:
+                        on_result(result)
+                    for retry_task, error in retry:
+                        schedule_retry(retry_task, attempt, error)
+                    self._on_success(latency)
+                self.stats['concurrency'] = self.limit
+
+        return results, failures
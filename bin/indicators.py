@@ -0,0 +1,296 @@
+#
+# Vectorized indicator engine for the Home page
+# Sorts once by (symbol, date) then computes lags and % changes over the contiguous per symbol segments,
+# rolling indicators come from a registry and are computed lazily per requested symbol (no sqlite round trip)
+#
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+import bin.memory_budget as memory_budget
+
+# longest rolling window the pages request
+MAX_WINDOW = 360
+# Calendar days of history needed before a window start so the longest rolling window (plus the lag) is full
+# 252 trading days a year, padded for holidays
+LOOKBACK_DAYS = int((MAX_WINDOW + 1) * 365 / 252) + 20
+
+
+def segment_positions(symbols):
+    """For rows sorted by symbol: (segment codes, start row of each row's segment, position within segment)"""
+    symbols = np.asarray(symbols)
+    n = len(symbols)
+    is_start = np.ones(n, dtype=bool)
+    if n > 1:
+        is_start[1:] = symbols[1:] != symbols[:-1]
+    codes = np.cumsum(is_start) - 1
+    starts = np.flatnonzero(is_start)
+    row_start = starts[codes]
+    return codes, row_start, np.arange(n) - row_start
+
+
+def grouped_lag(values, pos_in_segment, periods=1):
+    """values shifted by `periods` rows inside each segment (NaN at the start of every segment)"""
+    values = np.asarray(values, dtype='float64')
+    lagged = np.full(len(values), np.nan)
+    if len(values) > periods:
+        lagged[periods:] = values[:-periods]
+    lagged[pos_in_segment < periods] = np.nan
+    return lagged
+
+
+def grouped_rolling_means(values, codes, pos_in_segment, windows):
+    """
+    Rolling means for several windows at once, same semantics as
+    groupby(symbol).transform(lambda x: x.rolling(window=w).mean()): NaN until w valid values are in the window.
+    Uses per segment running sums, so every window is a difference of two cumulative sums.
+    """
+    values = np.asarray(values, dtype='float64')
+    valid = ~np.isnan(values)
+    keys = pd.Series(codes)
+    # running sums restart at every segment
+    csum = pd.Series(np.where(valid, values, 0.0)).groupby(keys, sort=False).cumsum().to_numpy()
+    ccount = pd.Series(valid.astype('int64')).groupby(keys, sort=False).cumsum().to_numpy()
+
+    means = {}
+    idx = np.arange(len(values))
+    for w in windows:
+        window_sum = csum.copy()
+        window_count = ccount.copy()
+        inner = pos_in_segment >= w
+        window_sum[inner] -= csum[idx[inner] - w]
+        window_count[inner] -= ccount[idx[inner] - w]
+        full = (pos_in_segment >= w - 1) & (window_count == w)
+        means[w] = np.where(full, window_sum / w, np.nan)
+    return means
+
+
+def grouped_rolling_mean_std(values, codes, pos_in_segment, window):
+    """
+    Rolling mean and sample std (ddof=1) over `window` rows inside each segment, NaN until the window is full
+    of valid values. Running sums are taken on values shifted by their segment mean, which keeps the sum of
+    squares small so the S2 - S1^2/n difference doesn't cancel catastrophically on long, high priced series.
+    """
+    values = np.asarray(values, dtype='float64')
+    valid = ~np.isnan(values)
+    keys = pd.Series(codes)
+    shift = pd.Series(values).groupby(keys, sort=False).transform('mean').to_numpy()
+    x = np.where(valid, values - shift, 0.0)
+    csum = pd.Series(x).groupby(keys, sort=False).cumsum().to_numpy()
+    csq = pd.Series(x * x).groupby(keys, sort=False).cumsum().to_numpy()
+    ccount = pd.Series(valid.astype('int64')).groupby(keys, sort=False).cumsum().to_numpy()
+
+    idx = np.arange(len(values))
+    inner = pos_in_segment >= window
+    s1, s2, n = csum.copy(), csq.copy(), ccount.copy()
+    s1[inner] -= csum[idx[inner] - window]
+    s2[inner] -= csq[idx[inner] - window]
+    n[inner] -= ccount[idx[inner] - window]
+    full = (pos_in_segment >= window - 1) & (n == window) & (window >= 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = s1 / window
+        var = np.maximum((s2 - s1 * mean) / (window - 1), 0.0)
+    return np.where(full, mean + shift, np.nan), np.where(full, np.sqrt(var), np.nan)
+
+
+def grouped_ewm_mean(values, codes, alpha, min_periods=0):
+    """
+    Per segment ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean(), leading NaNs of a segment skipped.
+    y[t] = (1 - alpha) * y[t-1] + alpha * x[t] is one linear recursive filter (lfilter) call per segment;
+    segments with NaNs after their first value go through pandas (its NaN handling isn't a plain filter).
+    """
+    values = np.asarray(values, dtype='float64')
+    n = len(values)
+    out = np.full(n, np.nan)
+    is_start = np.ones(n, dtype=bool)
+    if n > 1:
+        is_start[1:] = codes[1:] != codes[:-1]
+    starts = np.flatnonzero(is_start)
+    for start, stop in zip(starts, np.append(starts[1:], n)):
+        valid = ~np.isnan(values[start:stop])
+        if not valid.any():
+            continue
+        start += int(np.argmax(valid))
+        x = values[start:stop]
+        if not valid[-len(x):].all():
+            out[start:stop] = pd.Series(x).ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean().to_numpy()
+            continue
+        # initial state so that y[0] = x[0]
+        y, _ = lfilter([alpha], [1.0, alpha - 1.0], x, zi=[(1.0 - alpha) * x[0]])
+        y[:max(min_periods - 1, 0)] = np.nan
+        out[start:stop] = y
+    return out
+
+
+def build_home_base(quotes, float_dtype='float64'):
+    """
+    Home page base dataset from raw quotes (symbol, date, open, high, low, close, volume).
+    Rows come back sorted by (symbol, date): index, symbol (categorical), date (datetime64), quote cols, High-Low,
+    DailyVolatility_Perc, Close_lag, CloseChange_Perc. Rolling indicators are added on demand with compute()
+    float_dtype: 'float64' or 'float32' for the price/derived columns (math is always done in float64)
+    """
+    df = quotes.assign(date=pd.to_datetime(quotes['date']))
+    df = df.sort_values(['symbol', 'date'], kind='stable').reset_index(drop=True)
+    # Move Symbol to first column
+    column = df.pop('symbol')
+    df.insert(0, column.name, column)
+
+    _, _, pos = segment_positions(df['symbol'].to_numpy())
+    close = df['close'].to_numpy(dtype='float64')
+    high = df['high'].to_numpy(dtype='float64')
+    low = df['low'].to_numpy(dtype='float64')
+
+    df['High-Low'] = high - low
+    df['DailyVolatility_Perc'] = (high - low) * 100 / ((high + low) / 2)
+    close_lag = grouped_lag(close, pos)
+    df['Close_lag'] = close_lag
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (close - close_lag) * 100 / close_lag
+    # sqlite returned NULL for a 0 divisor
+    df['CloseChange_Perc'] = np.where(close_lag == 0, np.nan, change)
+
+    df.insert(0, 'index', np.arange(len(df), dtype='int32'))
+    float_columns = [c for c in df.columns if c not in ('index', 'symbol', 'date')]
+    df[float_columns] = df[float_columns].astype(float_dtype)
+    df['symbol'] = df['symbol'].astype('category')
+    return df
+
+
+#---------------------------------------------#
+#------------- Indicator registry ------------#
+#---------------------------------------------#
+# Indicators are declared once with their parameters and only computed for the symbols a chart/table asks for.
+# Every function gets the rows of one or more whole symbol segments (build_home_base columns) plus
+# segment codes/positions, and returns {column name: array aligned to those rows}.
+
+class Indicator:
+    """A registered indicator: function, default params and the column name template(s)"""
+
+    def __init__(self, name, func, defaults, columns):
+        self.name = name
+        self.func = func
+        self.defaults = defaults
+        self.columns = columns
+
+    def resolve(self, params=None):
+        """Defaults overridden by params, as a hashable sorted tuple"""
+        merged = dict(self.defaults)
+        merged.update(params or {})
+        unknown = set(merged) - set(self.defaults)
+        if unknown:
+            raise ValueError('{} got unknown params: {}'.format(self.name, sorted(unknown)))
+        return tuple(sorted(merged.items()))
+
+    def column_names(self, params):
+        return [template.format(**dict(params)) for template in self.columns]
+
+
+INDICATORS = {}
+
+
+def register(name, columns, **defaults):
+    def decorator(func):
+        INDICATORS[name] = Indicator(name, func, defaults, columns)
+        return func
+    return decorator
+
+
+@register('sma', ['_{window}day_SMA'], column='close', window=5)
+def sma(df, codes, pos, column, window):
+    return [grouped_rolling_means(df[column].to_numpy(dtype='float64'), codes, pos, [window])[window]]
+
+
+@register('rolling_vol', ['_{window}day_DailyVolPercAvg'], window=5)
+def rolling_vol(df, codes, pos, window):
+    return [grouped_rolling_means(df['DailyVolatility_Perc'].to_numpy(dtype='float64'), codes, pos, [window])[window]]
+
+
+@register('ema', ['_{span}day_EMA'], column='close', span=20)
+def ema(df, codes, pos, column, span):
+    return [grouped_ewm_mean(df[column].to_numpy(dtype='float64'), codes, 2.0 / (span + 1))]
+
+
+@register('bollinger', ['_{window}day_BB_mid', '_{window}day_BB_upper', '_{window}day_BB_lower'], window=20, k=2)
+def bollinger(df, codes, pos, window, k):
+    mid, std = grouped_rolling_mean_std(df['close'].to_numpy(dtype='float64'), codes, pos, window)
+    return [mid, mid + k * std, mid - k * std]
+
+
+@register('rsi', ['_{period}day_RSI'], period=14)
+def rsi(df, codes, pos, period):
+    # Wilder smoothing of gains/losses
+    close = df['close'].to_numpy(dtype='float64')
+    delta = close - grouped_lag(close, pos)
+    # the first row of a segment has no change (NaN), so the smoothing starts at the second row
+    gain = grouped_ewm_mean(np.where(delta < 0, 0.0, delta), codes, 1.0 / period, min_periods=period)
+    loss = grouped_ewm_mean(np.where(delta > 0, 0.0, -delta), codes, 1.0 / period, min_periods=period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100 - 100 / (1 + gain / loss)
+    return [np.where(loss == 0, 100.0, values)]
+
+
+# Memo of computed columns per (indicator, params, symbol, data version, first/last date and length of the segment)
+# (the first date matters for EMA/RSI, whose values depend on where the history starts, the last date and
+# length because a wider window of the same version is a longer segment that the cached arrays don't cover)
+# Entries live in a memory_budget.DatasetCache: the caller's (pages pass the one holding their derived datasets,
+# so the memo counts against the same budget and shows in its report) or this module's own.
+MEMO_BUDGET_MB = 256
+_default_memo = memory_budget.DatasetCache(MEMO_BUDGET_MB)
+
+
+def _memoized(indicator, params, index, symbols, data_versions, cache):
+    """{symbol: [column arrays over the symbol's whole segment]}, missing symbols computed in one vectorized pass"""
+    keys = {}
+    for s in symbols:
+        first, last = index.offsets[s]
+        keys[s] = ('indicator', indicator.name, params, s, data_versions.get(s),
+                   index.dates[first], index.dates[last - 1], last - first)
+    found = {}
+    for symbol, key in keys.items():
+        value = cache.get(key)
+        if value is not None:
+            found[symbol] = value
+    missing = [s for s in symbols if s not in found]
+    if missing:
+        rows = index.slice(missing)
+        codes, _, pos = segment_positions(rows['symbol'].to_numpy())
+        arrays = indicator.func(rows, codes, pos, **dict(params))
+        start = 0
+        for symbol in rows['symbol'].unique():
+            first, last = index.offsets[symbol]
+            stop = start + last - first
+            # copies, so a cached entry doesn't keep the whole batch's arrays alive
+            found[symbol] = [np.array(a[start:stop]) for a in arrays]
+            cache.put(keys[symbol], found[symbol], name='indicator:' + indicator.name)
+            start = stop
+    return found
+
+
+def compute(index, requests, symbols=None, date_min=None, date_max=None, data_versions=None, cache=None):
+    """
+    Rows of `symbols` (None = all) in the date window with the requested indicator columns appended.
+
+    Args:
+        index (QuoteIndex): build_home_base rows incl. history before date_min for the rolling windows
+        requests (list): (indicator name, params dict) pairs, e.g. [('sma', {'window': 30}), ('rsi', {})]
+        data_versions (dict): {symbol: data version}, part of the memo key
+        cache (DatasetCache): where memoized columns are kept, None for this module's own
+    Indicator columns get the dtype of the base 'close' column (float32 bases stay float32).
+    """
+    symbols = index.symbols if symbols is None else [s for s in dict.fromkeys(symbols) if s in index]
+    # index.slice returns rows in segment order
+    symbols = sorted(symbols, key=lambda s: index.offsets[s][0])
+    data_versions = data_versions or {}
+    rows = index.slice(symbols, date_min, date_max)
+    windows = [index.rows(s, date_min, date_max) for s in symbols]
+    columns = {}
+    dtype = index.frame['close'].dtype if 'close' in index.frame else np.float64
+    for name, params in requests:
+        indicator = INDICATORS[name]
+        params = indicator.resolve(params)
+        per_symbol = _memoized(indicator, params, index, symbols, data_versions, cache or _default_memo)
+        for i, column in enumerate(indicator.column_names(params)):
+            parts = [per_symbol[s][i][start - index.offsets[s][0]:stop - index.offsets[s][0]]
+                     for s, (start, stop) in zip(symbols, windows)]
+            columns[column] = (np.concatenate(parts) if parts else np.array([])).astype(dtype, copy=False)
+    return rows.assign(**columns)
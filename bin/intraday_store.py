@@ -0,0 +1,161 @@
+#
+# Write-once local store of intraday bars, one parquet file per (interval, symbol, session date)
+# Bars of a closed session never change, so a session is fetched from Yahoo once and then only read from disk.
+# That also keeps sessions older than Yahoo's intraday lookback (7 days for 1m, 60 days for 2m-90m,
+# 730 days for hourly) available once they have been captured.
+# Bars are stored unadjusted (auto_adjust=False): adjusted intraday prices move with every later dividend.
+#
+
+import os
+from urllib.parse import quote
+import pandas as pd
+import config
+import bin.quote_source as quote_source
+import bin.fetch_scheduler as fetch_scheduler
+
+STORE_DIR = config.intraday_cache_dir
+# sessions are dated in exchange time, today's session is still open until it is a past date there
+EXCHANGE_TZ = 'America/New_York'
+# how far back Yahoo serves each interval (calendar days), older sessions can only come from the store
+LOOKBACK_DAYS = {'1m': 7, '2m': 60, '5m': 60, '15m': 60, '30m': 60, '90m': 60, '60m': 730, '1h': 730}
+# fetch scheduler settings for missing sessions (one request per run of adjacent missing sessions)
+REQUESTS_PER_SEC = 2.0
+MAX_RETRIES = 2
+# missing sessions further apart than this (calendar days, covers a weekend plus a holiday) are fetched separately
+RUN_GAP_DAYS = 4
+
+FAILURE_COLUMNS = ['symbol', 'session', 'interval', 'error']
+
+
+def _session_path(symbol, session, interval):
+    return os.path.join(STORE_DIR, 'interval=' + interval, 'symbol=' + quote(symbol, safe=''),
+                        pd.Timestamp(session).strftime('%Y-%m-%d') + '.parquet')
+
+
+def _today():
+    return pd.Timestamp.now(tz=EXCHANGE_TZ).tz_localize(None).normalize()
+
+
+def is_closed(session):
+    """True for sessions before today's exchange date (their bars are final)"""
+    return pd.Timestamp(session).normalize() < _today()
+
+
+def is_fetchable(session, interval):
+    """True while the session is still inside Yahoo's lookback for the interval"""
+    days = LOOKBACK_DAYS.get(interval)
+    return days is None or pd.Timestamp(session).normalize() > _today() - pd.Timedelta(days=days)
+
+
+def has_session(symbol, session, interval):
+    return os.path.exists(_session_path(symbol, session, interval))
+
+
+def read_session(symbol, session, interval):
+    """Stored bars of one session (empty frame for a stored session without trading), None when not stored"""
+    path = _session_path(symbol, session, interval)
+    return pd.read_parquet(path) if os.path.exists(path) else None
+
+
+def _write_session(symbol, session, interval, bars):
+    # write-once: an existing session file is never replaced
+    path = _session_path(symbol, session, interval)
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    bars.to_parquet(path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def _flatten(data):
+    if isinstance(data.columns, pd.MultiIndex):
+        # single ticker downloads come back as (Price, Ticker)
+        data = data.copy()
+        data.columns = data.columns.get_level_values(0)
+    data.columns.name = None
+    return data
+
+
+def download_range(symbol, first, last, interval):
+    """Bars of the sessions first..last (inclusive) from one quote source request, split per exchange date.
+    Returns {session Timestamp: DataFrame} for the sessions that have bars.
+    """
+    first, last = pd.Timestamp(first).normalize(), pd.Timestamp(last).normalize()
+    source = quote_source.get_quote_source()
+    data = source.download(symbol, start=first.strftime('%Y-%m-%d'), end=(last + pd.Timedelta(days=1)).strftime('%Y-%m-%d'),
+                           interval=interval, auto_adjust=False, progress=False)
+    if data is None or data.empty:
+        error = source.download_errors().get(symbol)
+        if error:
+            # failed call (throttled / network), not a range without trading: raise so it is retried, never stored
+            raise RuntimeError(error)
+        return {}
+    data = _flatten(data).dropna(how='all')
+    index = data.index
+    # bars belong to their exchange date
+    local = index.tz_convert(EXCHANGE_TZ) if index.tz is not None else index
+    dates = local.normalize().tz_localize(None) if local.tz is not None else local.normalize()
+    return {session: data[dates == session] for session in dates.unique() if first <= session <= last}
+
+
+def _missing_runs(sessions, missing):
+    # missing sessions grouped into runs: a stored session or a gap over RUN_GAP_DAYS starts a new run
+    runs, run, previous = [], [], None
+    missing = set(missing)
+    for session in sessions:
+        if session not in missing:
+            previous = None
+            continue
+        if run and (previous is None or (session - previous).days > RUN_GAP_DAYS):
+            runs.append(tuple(run))
+            run = []
+        run.append(session)
+        previous = session
+    if run:
+        runs.append(tuple(run))
+    return runs
+
+
+def get_sessions(symbol, sessions, interval='60m', scheduler=None):
+    """
+    Bars for each session date, from the store where present. Missing ones are fetched with one request per
+    run of adjacent missing sessions, so stored sessions in between are not downloaded again.
+    Closed sessions are written to the store (once), today's session is fetched but never stored. A closed
+    session without bars is only stored when the same response had bars for a later session (a market holiday,
+    not a day Yahoo has not published yet).
+    Sessions outside Yahoo's lookback that were never captured come back missing.
+
+    Returns:
+        tuple: (bars, failures)
+            - bars: {session Timestamp: DataFrame of bars} (sessions without trading map to an empty frame)
+            - failures: DataFrame with one row per session that could not be fetched (symbol, session, interval, error)
+    """
+    sessions = sorted({pd.Timestamp(s).normalize() for s in sessions})
+    bars, missing = {}, []
+    for session in sessions:
+        stored = read_session(symbol, session, interval)
+        if stored is not None:
+            bars[session] = stored
+        elif is_fetchable(session, interval):
+            missing.append(session)
+
+    failures = []
+    if missing:
+        # downloads are serialized by the quote source, one run in flight at a time
+        scheduler = scheduler or fetch_scheduler.FetchScheduler(rate=REQUESTS_PER_SEC, max_concurrency=1,
+                                                                max_retries=MAX_RETRIES)
+
+        def fetch(run):
+            return (run, download_range(symbol, run[0], run[-1], interval)), []
+
+        results, failed_runs = scheduler.run(_missing_runs(sessions, missing), fetch)
+        for run, fetched in results:
+            last_with_bars = max((s for s, data in fetched.items() if not data.empty), default=None)
+            for session in run:
+                data = fetched.get(session, pd.DataFrame())
+                if is_closed(session) and (not data.empty or (last_with_bars is not None and session < last_with_bars)):
+                    _write_session(symbol, session, interval, data)
+                bars[session] = data
+        failures = [{'symbol': symbol, 'session': session.date(), 'interval': interval, 'error': error}
+                    for run, error in failed_runs for session in run]
+    return bars, pd.DataFrame(failures, columns=FAILURE_COLUMNS)
@@ -0,0 +1,110 @@
+#
+# Memory bounded LRU for the derived datasets the pages keep in process (Home window datasets etc.)
+# Sizes are measured (deep pandas memory) when a dataset is stored, least recently used entries are
+# evicted once the total passes the budget. report() shows what every cached dataset costs.
+#
+
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+
+def nbytes(value):
+    """Deep memory of a dataset: DataFrame, ndarray, objects with a .frame (QuoteIndex) or tuples of those"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(v) for v in value)
+    if hasattr(value, 'frame'):
+        return nbytes(value.frame) + sum(nbytes(v) for v in vars(value).values() if isinstance(v, np.ndarray))
+    return 0
+
+
+def _rows(value):
+    frame = getattr(value, 'frame', value)
+    return len(frame) if isinstance(frame, (pd.DataFrame, pd.Series)) else None
+
+
+class DatasetCache:
+    """
+    LRU of datasets keyed by any hashable key, bounded by total memory.
+
+    Args:
+        budget_mb (float): total budget, the entry just built is always kept even if it alone exceeds it
+    """
+
+    def __init__(self, budget_mb):
+        self.budget_bytes = int(budget_mb * 2**20)
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.evictions = 0
+
+    def get(self, key):
+        """Cached value for key (and marks it recently used), None when not cached"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            entry['hits'] += 1
+            entry['last_used'] = time.time()
+            return entry['value']
+
+    def put(self, key, value, name=None):
+        """Store value under key, older entries are evicted past the budget"""
+        with self._lock:
+            self._entries[key] = {'name': name or str(key[0] if isinstance(key, tuple) else key), 'value': value,
+                                  'bytes': nbytes(value), 'rows': _rows(value), 'hits': 0,
+                                  'created': time.time(), 'last_used': time.time()}
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def get_or_build(self, key, build, name=None):
+        """Cached value for key, else build() stored under it (and older entries evicted past the budget)"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        # build outside the lock, other datasets stay readable meanwhile
+        value = build()
+        self.put(key, value, name)
+        return value
+
+    def _evict(self):
+        while len(self._entries) > 1 and self.total_bytes() > self.budget_bytes:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(entry['bytes'] for entry in self._entries.values())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def summary(self):
+        """Totals per dataset name (entries, memory, hits), largest first"""
+        report = self.report()
+        summary = report.groupby('dataset', as_index=False).agg(
+            entries=('key', 'size'), memory_mb=('memory_mb', 'sum'), hits=('hits', 'sum'))
+        return summary.sort_values('memory_mb', ascending=False).reset_index(drop=True)
+
+    def report(self):
+        """One row per cached dataset, most recently used first"""
+        with self._lock:
+            rows = [{
+                'dataset': entry['name'],
+                'key': str(key[1:] if isinstance(key, tuple) else key)[:120],
+                'rows': entry['rows'],
+                'memory_mb': round(entry['bytes'] / 2**20, 2),
+                'hits': entry['hits'],
+                'age_s': round(time.time() - entry['created']),
+                'idle_s': round(time.time() - entry['last_used']),
+            } for key, entry in reversed(self._entries.items())]
+        return pd.DataFrame(rows, columns=['dataset', 'key', 'rows', 'memory_mb', 'hits', 'age_s', 'idle_s'])
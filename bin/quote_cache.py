@@ -0,0 +1,193 @@
+#
+# Local columnar (parquet) copy of dbo.symbol_quotes, one partition per symbol
+# Synced incrementally from the DB using the per symbol watermarks / data versions in dbo.symbol_load_state
+#
+
+import json
+import os
+import threading
+from urllib.parse import quote
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import config
+import bin.database as database
+import bin.rolling_state as rolling_state
+
+CACHE_DIR = config.quote_cache_dir
+MANIFEST_FILE = '_manifest.json'
+QUOTE_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'adj_close', 'volume']
+
+_sync_lock = threading.Lock()
+
+
+def _partition_path(symbol):
+    # hive style partition dir, symbol is uri encoded so '^GSPC' etc. are safe on disk
+    return os.path.join(CACHE_DIR, 'symbol=' + quote(symbol, safe=''), 'quotes.parquet')
+
+
+def load_manifest():
+    """{symbol: {'maxdate': 'YYYY-MM-DD', 'data_version': int}} of what is on disk"""
+    path = os.path.join(CACHE_DIR, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, MANIFEST_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def symbol_versions():
+    """{symbol: data version} of what is on disk, a symbol's version only moves when its rows changed"""
+    return {symbol: entry.get('data_version', 0) for symbol, entry in load_manifest().items()}
+
+
+def get_remote_watermarks():
+    """Per symbol watermark from the DB, one row per symbol (no scan of dbo.symbol_quotes)"""
+    sql = """
+    select s.symbol, ls.last_loaded_date maxdate, ls.data_version
+    from dbo.symbols s
+    join dbo.symbol_load_state ls on ls.symbol = s.symbol
+    """
+    return database.read_sql(sql)
+
+
+def get_stale_symbols(remote=None, manifest=None):
+    """Symbols whose DB watermark or data version moved since the last sync. Returns {symbol: local maxdate or None}"""
+    remote = get_remote_watermarks() if remote is None else remote
+    manifest = load_manifest() if manifest is None else manifest
+    stale = {}
+    for row in remote.itertuples(index=False):
+        if pd.isna(row.maxdate):
+            continue
+        local = manifest.get(row.symbol)
+        if local is None:
+            stale[row.symbol] = None
+        elif local.get('data_version') != row.data_version or local['maxdate'] < str(row.maxdate):
+            stale[row.symbol] = local['maxdate']
+    return stale
+
+
+def _fetch_new_rows(stale):
+    """All rows on/after each symbol's local watermark in one query.
+    The watermark day itself is re-read so revised bars replace the cached copy.
+    """
+    sql = """
+    SELECT sq.symbol, sq."date",
+    cast(sq."open" as float) as open,
+    cast(sq.high as float) as high,
+    cast(sq.low as float) as low,
+    cast(sq."close" as float) as close,
+    cast(sq.adj_close as float) as adj_close,
+    cast(sq.volume as float) as volume
+    FROM dbo.symbol_quotes sq
+    join unnest(%s::varchar[], %s::date[]) as w(symbol, maxdate)
+        on w.symbol = sq.symbol and sq."date" >= w.maxdate
+    """
+    symbols = list(stale)
+    maxdates = [stale[s] or '1900-01-01' for s in symbols]
+    return database.read_sql(sql, params=(symbols, maxdates))
+
+
+def _write_partition(symbol, new_rows):
+    path = _partition_path(symbol)
+    frame = new_rows[QUOTE_COLUMNS]
+    if os.path.exists(path):
+        existing = pd.read_parquet(path)
+        frame = pd.concat([existing, frame], ignore_index=True)
+        frame = frame.drop_duplicates(subset='date', keep='last')
+    frame = frame.sort_values('date').reset_index(drop=True)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    frame.to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+    return frame
+
+
+def _drop_partition(symbol):
+    path = _partition_path(symbol)
+    if os.path.exists(path):
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+
+def sync_quote_cache():
+    """Pull only new/revised rows for symbols whose DB watermark moved. Returns the synced symbols.
+    Symbols no longer in dbo.symbols are dropped from the cache.
+    """
+    with _sync_lock:
+        remote = get_remote_watermarks()
+        manifest = load_manifest()
+        removed = set(manifest) - set(remote['symbol'])
+        for symbol in removed:
+            _drop_partition(symbol)
+            rolling_state.drop_state(symbol)
+            del manifest[symbol]
+        stale = get_stale_symbols(remote, manifest)
+        # cached symbols without rolling state yet (first run after an upgrade, or state was cleared)
+        bootstrap = [s for s in manifest if s not in stale and not rolling_state.has_state(s)]
+        for symbol in bootstrap:
+            partition = pd.read_parquet(_partition_path(symbol))
+            rolling_state.apply(symbol, partition.iloc[0:0], partition)
+        if not stale:
+            if removed:
+                _save_manifest(manifest)
+            if removed or bootstrap:
+                rolling_state.save_latest(bootstrap, removed)
+            return []
+        new_rows = _fetch_new_rows(stale)
+        remote = remote.set_index('symbol')
+        for symbol, rows in new_rows.groupby('symbol'):
+            frame = _write_partition(symbol, rows)
+            # indicators of the appended rows from the persisted window tails, O(new rows)
+            rolling_state.apply(symbol, rows, frame)
+            manifest[symbol] = {
+                'maxdate': str(frame['date'].iloc[-1]),
+                'data_version': int(remote.loc[symbol, 'data_version']),
+            }
+        _save_manifest(manifest)
+        rolling_state.save_latest(list(new_rows['symbol'].unique()) + bootstrap, removed)
+        return list(stale)
+
+
+def read_quotes(symbols=None, columns=None, date_min=None, date_max=None):
+    """
+    Read quotes from the local store, only touching the partitions/columns/row groups asked for.
+
+    Args:
+        symbols (list): symbols to read, None for every cached symbol
+        columns (list): quote columns to read (default all), 'symbol' is always returned first
+        date_min / date_max (date): inclusive date bounds, None for unbounded
+    """
+    columns = [c for c in (columns or QUOTE_COLUMNS) if c != 'symbol']
+    if not os.path.exists(CACHE_DIR):
+        return pd.DataFrame(columns=['symbol'] + columns)
+    partitioning = ds.partitioning(pa.schema([('symbol', pa.string())]), flavor='hive')
+    dataset = ds.dataset(CACHE_DIR, format='parquet', partitioning=partitioning, exclude_invalid_files=True,
+                         ignore_prefixes=['_', '.'])
+    predicates = []
+    if symbols is not None:
+        predicates.append(ds.field('symbol').isin(list(symbols)))
+    if date_min is not None:
+        predicates.append(ds.field('date') >= pa.scalar(pd.Timestamp(date_min).date()))
+    if date_max is not None:
+        predicates.append(ds.field('date') <= pa.scalar(pd.Timestamp(date_max).date()))
+    filter_expr = None
+    for predicate in predicates:
+        filter_expr = predicate if filter_expr is None else filter_expr & predicate
+    table = dataset.to_table(columns=['symbol'] + columns, filter=filter_expr)
+    df = table.to_pandas()
+    df['symbol'] = df['symbol'].astype(str)
+    return df
+
+
+def verify_rolling_state(symbols=None):
+    """Full recompute check of the persisted rolling state (bin/rolling_state.py) for cached symbols"""
+    symbols = list(load_manifest()) if symbols is None else symbols
+    results = [rolling_state.verify(symbol, pd.read_parquet(_partition_path(symbol))) for symbol in symbols]
+    return pd.concat(results, ignore_index=True) if results else pd.DataFrame(columns=['symbol', 'column', 'expected', 'state'])
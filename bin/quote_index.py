@@ -0,0 +1,71 @@
+#
+# (symbol, date) sorted quote layout with per symbol offsets
+# Symbol lookups are a dict hit, date windows a binary search inside the symbol's segment:
+# no string conversion, no full column scan, a single symbol slice is a view of the frame
+#
+
+import numpy as np
+import pandas as pd
+
+
+def _as_datetime64(value):
+    return None if value is None else np.datetime64(pd.Timestamp(value), 'ns')
+
+
+class QuoteIndex:
+    """
+    Wraps a frame sorted by (symbol, date) with a datetime64 'date' column.
+
+    Args:
+        frame (DataFrame): rows sorted by symbol then date (e.g. indicators.build_home_base output)
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.dates = frame['date'].to_numpy(dtype='datetime64[ns]')
+        symbols = frame['symbol'].to_numpy()
+        n = len(symbols)
+        is_start = np.ones(n, dtype=bool)
+        if n > 1:
+            is_start[1:] = symbols[1:] != symbols[:-1]
+        starts = np.flatnonzero(is_start)
+        stops = np.append(starts[1:], n)
+        # {symbol: (first row, last row + 1)}
+        self.offsets = {symbols[a]: (a, b) for a, b in zip(starts, stops)}
+
+    def __contains__(self, symbol):
+        return symbol in self.offsets
+
+    @property
+    def symbols(self):
+        return list(self.offsets)
+
+    def rows(self, symbol, date_min=None, date_max=None):
+        """[start, stop) row range of one symbol within the inclusive date window"""
+        start, stop = self.offsets.get(symbol, (0, 0))
+        dates = self.dates[start:stop]
+        lo = 0 if date_min is None else np.searchsorted(dates, _as_datetime64(date_min), side='left')
+        hi = len(dates) if date_max is None else np.searchsorted(dates, _as_datetime64(date_max), side='right')
+        return start + lo, start + max(lo, hi)
+
+    def slice(self, symbols=None, date_min=None, date_max=None):
+        """
+        Rows of `symbols` (None = all) with date_min <= date <= date_max, still (symbol, date) sorted.
+        A contiguous selection (one symbol, or every symbol without a date window) comes back as a
+        view of the frame, anything else as one positional take.
+        """
+        symbols = self.symbols if symbols is None else [s for s in dict.fromkeys(symbols) if s in self.offsets]
+        ranges = []
+        for start, stop in sorted(self.rows(symbol, date_min, date_max) for symbol in symbols):
+            # neighbouring segments merge, so contiguous selections stay a single slice
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], stop)
+            elif stop > start:
+                ranges.append((start, stop))
+        if len(ranges) == 1:
+            start, stop = ranges[0]
+            return self.frame.iloc[start:stop]
+        if not ranges:
+            return self.frame.iloc[0:0]
+        positions = np.concatenate([np.arange(start, stop) for start, stop in ranges])
+        return self.frame.take(positions)
@@ -0,0 +1,351 @@
+#
+# Pluggable market data source
+#   live   -> yfinance
+#   record -> yfinance, and everything returned is also written to disk
+#   replay -> served from the recordings on disk, no network
+# Pick one with config.quote_source or the STOCKFINDER_QUOTE_SOURCE env var
+#
+
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from urllib.parse import quote
+import pandas as pd
+import yfinance as yf
+import config
+import bin.fetch_scheduler as fetch_scheduler
+
+
+class RecordingNotFound(KeyError):
+    """Replay was asked for something that was never recorded"""
+
+
+class QuoteSource(ABC):
+    """Everything the pages and the ETL ask Yahoo for, a source missing any of it fails when constructed"""
+
+    @abstractmethod
+    def download(self, tickers, **kwargs):
+        """Same arguments/shape as yf.download"""
+
+    def download_errors(self):
+        """{ticker: message} for tickers the last download (on this thread) could not load"""
+        return {}
+
+    @abstractmethod
+    def history(self, symbol, **kwargs):
+        """Same arguments/shape as yf.Ticker(symbol).history"""
+
+    @abstractmethod
+    def dividends(self, symbol):
+        """Same shape as yf.Ticker(symbol).dividends"""
+
+    @abstractmethod
+    def splits(self, symbol):
+        """Same shape as yf.Ticker(symbol).splits"""
+
+    @abstractmethod
+    def actions(self, symbol):
+        """Same shape as yf.Ticker(symbol).actions: dividends and splits from one full history request"""
+
+    @abstractmethod
+    def info(self, symbol):
+        """Same shape as yf.Ticker(symbol).info"""
+
+    @abstractmethod
+    def quarterly_financials(self, symbol):
+        """Same shape as yf.Ticker(symbol).quarterly_financials"""
+
+
+# yf.download collects its frames and errors in module globals (yf.shared) that every call clears,
+# so calls from different threads would swap each other's results: one download at a time
+_download_lock = threading.Lock()
+
+
+class YFinanceSource(QuoteSource):
+    """Live yfinance backend"""
+
+    def __init__(self):
+        self._errors = threading.local()
+
+    def download(self, tickers, **kwargs):
+        # queueing behind another thread's download is not request latency for the fetch scheduler
+        with fetch_scheduler.waiting():
+            _download_lock.acquire()
+        try:
+            data = yf.download(tickers, **kwargs)
+            # errors of this call, read before another thread's download resets them
+            shared = getattr(yf, 'shared', None)
+            self._errors.last = dict(getattr(shared, '_ERRORS', {}) or {})
+        finally:
+            _download_lock.release()
+        return data
+
+    def download_errors(self):
+        return dict(getattr(self._errors, 'last', {}))
+
+    def history(self, symbol, **kwargs):
+        return yf.Ticker(symbol).history(**kwargs)
+
+    def dividends(self, symbol):
+        return yf.Ticker(symbol).dividends
+
+    def splits(self, symbol):
+        return yf.Ticker(symbol).splits
+
+    def actions(self, symbol):
+        return yf.Ticker(symbol).actions
+
+    def info(self, symbol):
+        return yf.Ticker(symbol).info
+
+    def quarterly_financials(self, symbol):
+        return yf.Ticker(symbol).quarterly_financials
+
+
+#---------------------------------------------#
+#------------- On disk recordings ------------#
+#---------------------------------------------#
+# <recordings_dir>/<kind>/<symbol>.pkl
+#   bars are merged per (call, interval, adjusted) so later requests can be sliced out of them
+#   dividends/splits/info/financials keep the latest snapshot
+
+_PERIOD_RE = re.compile(r'^(\d+)(d|wk|mo|y)$')
+
+
+def _bars_kind(call, kwargs):
+    interval = kwargs.get('interval', '1d')
+    adjusted = kwargs.get('auto_adjust', True)
+    return '{}_{}_{}'.format(call, interval, 'adj' if adjusted else 'raw')
+
+
+def _ticker_list(tickers):
+    if isinstance(tickers, str):
+        return tickers.replace(',', ' ').split()
+    return list(tickers)
+
+
+def _split_download(data, tickers, group_by):
+    """yf.download result -> {ticker: frame with plain Price columns}"""
+    frames = {}
+    if data is None or data.empty:
+        return frames
+    if not isinstance(data.columns, pd.MultiIndex):
+        return {tickers[0]: data} if len(tickers) == 1 else frames
+    ticker_level = 0 if group_by == 'ticker' else 1
+    for ticker in tickers:
+        if ticker not in data.columns.get_level_values(ticker_level):
+            continue
+        frame = data.xs(ticker, axis=1, level=ticker_level).dropna(how='all')
+        if not frame.empty:
+            frames[ticker] = frame
+    return frames
+
+
+def _join_download(frames, tickers, group_by):
+    """Inverse of _split_download, rebuilds the yf.download column layout"""
+    frames = {t: frames[t] for t in tickers if t in frames}
+    if not frames:
+        return pd.DataFrame()
+    data = pd.concat(frames, axis=1, names=['Ticker', 'Price'])
+    if group_by != 'ticker':
+        data = data.swaplevel(0, 1, axis=1)
+        data.columns.names = ['Price', 'Ticker']
+    return data
+
+
+def _slice_bars(bars, start=None, end=None, period=None, **kwargs):
+    """Apply start/end (end exclusive) or period to recorded bars"""
+    if bars.empty:
+        return bars
+    tz = bars.index.tz
+
+    def as_index_ts(value):
+        ts = pd.Timestamp(value)
+        if tz is not None and ts.tz is None:
+            return ts.tz_localize(tz)
+        if tz is None and ts.tz is not None:
+            return ts.tz_convert(None)
+        return ts
+
+    if start is not None or end is not None:
+        if start is not None:
+            bars = bars[bars.index >= as_index_ts(start)]
+        if end is not None:
+            bars = bars[bars.index < as_index_ts(end)]
+        return bars
+    if period in (None, 'max'):
+        return bars
+    last = bars.index.max()
+    if period == 'ytd':
+        return bars[bars.index >= last.replace(month=1, day=1, hour=0, minute=0, second=0)]
+    match = _PERIOD_RE.match(period)
+    if match is None:
+        return bars
+    n, unit = int(match.group(1)), match.group(2)
+    offsets = {'d': pd.DateOffset(days=n), 'wk': pd.DateOffset(weeks=n),
+               'mo': pd.DateOffset(months=n), 'y': pd.DateOffset(years=n)}
+    return bars[bars.index > last - offsets[unit]]
+
+
+class RecordingStore:
+    """Pickle files per (kind, symbol)"""
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def path(self, kind, symbol):
+        return os.path.join(self.root, kind, quote(symbol, safe='') + '.pkl')
+
+    def load(self, kind, symbol):
+        path = self.path(kind, symbol)
+        if not os.path.exists(path):
+            raise RecordingNotFound('{} not recorded for {}'.format(kind, symbol))
+        return pd.read_pickle(path)
+
+    def save(self, kind, symbol, value):
+        path = self.path(kind, symbol)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            pd.to_pickle(value, path + '.tmp')
+            os.replace(path + '.tmp', path)
+
+    def merge_bars(self, kind, symbol, bars):
+        """Union of every bar seen for this symbol, newest copy wins"""
+        if bars is None or bars.empty:
+            return
+        with self._lock:
+            path = self.path(kind, symbol)
+            if os.path.exists(path):
+                existing = pd.read_pickle(path)
+                bars = pd.concat([existing, bars])
+                bars = bars[~bars.index.duplicated(keep='last')].sort_index()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            pd.to_pickle(bars, path + '.tmp')
+            os.replace(path + '.tmp', path)
+
+
+class RecordingSource(QuoteSource):
+    """Passes through to another source and records every result"""
+
+    def __init__(self, inner, root):
+        self.inner = inner
+        self.store = RecordingStore(root)
+
+    def download(self, tickers, **kwargs):
+        data = self.inner.download(tickers, **kwargs)
+        group_by = kwargs.get('group_by', 'column')
+        tickers = _ticker_list(tickers)
+        for ticker, frame in _split_download(data, tickers, group_by).items():
+            self.store.merge_bars(_bars_kind('download', kwargs), ticker, frame)
+        return data
+
+    def download_errors(self):
+        return self.inner.download_errors()
+
+    def history(self, symbol, **kwargs):
+        data = self.inner.history(symbol, **kwargs)
+        self.store.merge_bars(_bars_kind('history', kwargs), symbol, data)
+        return data
+
+    def _snapshot(self, kind, symbol):
+        value = getattr(self.inner, kind)(symbol)
+        self.store.save(kind, symbol, value)
+        return value
+
+    def dividends(self, symbol):
+        return self._snapshot('dividends', symbol)
+
+    def splits(self, symbol):
+        return self._snapshot('splits', symbol)
+
+    def actions(self, symbol):
+        return self._snapshot('actions', symbol)
+
+    def info(self, symbol):
+        return self._snapshot('info', symbol)
+
+    def quarterly_financials(self, symbol):
+        return self._snapshot('quarterly_financials', symbol)
+
+
+class ReplaySource(QuoteSource):
+    """Serves recorded history, dividends, info and intraday bars from disk"""
+
+    def __init__(self, root):
+        self.store = RecordingStore(root)
+        self._errors = threading.local()
+
+    def download(self, tickers, **kwargs):
+        group_by = kwargs.get('group_by', 'column')
+        tickers = _ticker_list(tickers)
+        frames, errors = {}, {}
+        for ticker in tickers:
+            try:
+                bars = self.store.load(_bars_kind('download', kwargs), ticker)
+            except RecordingNotFound as e:
+                errors[ticker] = str(e)
+                continue
+            frames[ticker] = _slice_bars(bars, **kwargs)
+        self._errors.last = errors
+        return _join_download(frames, tickers, group_by)
+
+    def download_errors(self):
+        return dict(getattr(self._errors, 'last', {}))
+
+    def history(self, symbol, **kwargs):
+        try:
+            bars = self.store.load(_bars_kind('history', kwargs), symbol)
+        except RecordingNotFound:
+            # same as yfinance for an unknown symbol
+            return pd.DataFrame()
+        return _slice_bars(bars, **kwargs)
+
+    def dividends(self, symbol):
+        return self.store.load('dividends', symbol)
+
+    def splits(self, symbol):
+        return self.store.load('splits', symbol)
+
+    def actions(self, symbol):
+        return self.store.load('actions', symbol)
+
+    def info(self, symbol):
+        return self.store.load('info', symbol)
+
+    def quarterly_financials(self, symbol):
+        return self.store.load('quarterly_financials', symbol)
+
+
+_source = None
+_source_lock = threading.Lock()
+
+
+def make_quote_source(mode=None, root=None):
+    """Build a source for mode 'live', 'record' or 'replay'"""
+    mode = mode or os.environ.get('STOCKFINDER_QUOTE_SOURCE') or config.quote_source
+    root = root or config.quote_recordings_dir
+    if mode == 'live':
+        return YFinanceSource()
+    if mode == 'record':
+        return RecordingSource(YFinanceSource(), root)
+    if mode == 'replay':
+        return ReplaySource(root)
+    raise ValueError("quote source must be 'live', 'record' or 'replay', got: " + str(mode))
+
+
+def get_quote_source():
+    """Process wide source used by the pages and the ETL"""
+    global _source
+    if _source is None:
+        with _source_lock:
+            if _source is None:
+                _source = make_quote_source()
+    return _source
+
+
+def set_quote_source(source):
+    """Swap the process wide source (benchmarks / offline runs)"""
+    global _source
+    _source = source
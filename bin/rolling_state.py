@@ -0,0 +1,211 @@
+#
+# Persisted per symbol rolling state for the local quote store (bin/quote_cache.py)
+# Each symbol keeps the tail of its series (last MAX_WINDOW + REWIND_ROWS closes / daily vol %) and row count,
+# so when a sync appends bars the SMAs, volatility averages and CloseChange_Perc of the new rows are derived
+# from tail + new rows only: O(new rows + window), not O(history).
+# The latest derived row of every symbol is kept in one small parquet for the Home profile table.
+#
+
+import os
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+import config
+import bin.indicators as indicators
+
+STATE_DIR = config.rolling_state_dir
+LATEST_FILE = '_latest.parquet'
+SMA_WINDOWS = [5, 10, 30, 90, 360]
+VOL_WINDOWS = [5, 10, 30, 90, 360]
+MAX_WINDOW = max(SMA_WINDOWS + VOL_WINDOWS)
+# revised bars up to this many rows back are rolled back in place, anything older forces a full recompute
+REWIND_ROWS = 5
+LATEST_COLUMNS = ['symbol', 'date', 'close', 'Close_lag', 'CloseChange_Perc', 'DailyVolatility_Perc'] + \
+    ['_{}day_SMA'.format(w) for w in SMA_WINDOWS] + ['_{}day_DailyVolPercAvg'.format(w) for w in VOL_WINDOWS]
+
+
+def _state_path(symbol):
+    return os.path.join(STATE_DIR, quote(symbol, safe='') + '.pkl')
+
+
+def has_state(symbol):
+    return os.path.exists(_state_path(symbol))
+
+
+def load_state(symbol):
+    path = _state_path(symbol)
+    return pd.read_pickle(path) if os.path.exists(path) else None
+
+
+def _save_state(symbol, state):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    path = _state_path(symbol)
+    pd.to_pickle(state, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def drop_state(symbol):
+    path = _state_path(symbol)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _empty_state():
+    return {
+        'length': 0,
+        'dates': np.array([], dtype='datetime64[ns]'),
+        'close': np.array([], dtype='float64'),
+        'vol_perc': np.array([], dtype='float64'),
+    }
+
+
+def _derive(state, rows):
+    """
+    Derived columns for `rows` (date sorted, after everything in the state tail).
+    Returns (frame of the new rows, next state).
+    """
+    dates = pd.to_datetime(rows['date']).to_numpy(dtype='datetime64[ns]')
+    close_new = rows['close'].to_numpy(dtype='float64')
+    high = rows['high'].to_numpy(dtype='float64')
+    low = rows['low'].to_numpy(dtype='float64')
+    vol_new = (high - low) * 100 / ((high + low) / 2)
+
+    tail_len = len(state['close'])
+    close = np.concatenate([state['close'], close_new])
+    vol_perc = np.concatenate([state['vol_perc'], vol_new])
+    # absolute row positions, so windows that reach back before the tail stay NaN exactly like a full recompute
+    first_pos = state['length'] - tail_len
+    pos = first_pos + np.arange(len(close))
+    codes = np.zeros(len(close), dtype='int64')
+
+    close_lag = indicators.grouped_lag(close, pos)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (close - close_lag) * 100 / close_lag
+    out = pd.DataFrame({
+        'date': dates,
+        'close': close_new,
+        'Close_lag': close_lag[tail_len:],
+        'CloseChange_Perc': np.where(close_lag == 0, np.nan, change)[tail_len:],
+        'DailyVolatility_Perc': vol_new,
+    })
+    sma = indicators.grouped_rolling_means(close, codes, pos, SMA_WINDOWS)
+    for w in SMA_WINDOWS:
+        out['_{}day_SMA'.format(w)] = sma[w][tail_len:]
+    vol_avg = indicators.grouped_rolling_means(vol_perc, codes, pos, VOL_WINDOWS)
+    for w in VOL_WINDOWS:
+        out['_{}day_DailyVolPercAvg'.format(w)] = vol_avg[w][tail_len:]
+
+    keep = MAX_WINDOW + REWIND_ROWS
+    next_state = {
+        'length': state['length'] + len(rows),
+        'dates': np.concatenate([state['dates'], dates])[-keep:],
+        'close': close[-keep:],
+        'vol_perc': vol_perc[-keep:],
+    }
+    return out, next_state
+
+
+def _rewind(state, first_date):
+    """State with the tail rows on/after first_date removed, None if they reach back past the tail"""
+    drop = int(np.count_nonzero(state['dates'] >= np.datetime64(pd.Timestamp(first_date), 'ns')))
+    if drop == 0:
+        return state
+    if drop > REWIND_ROWS:
+        return None
+    return {
+        'length': state['length'] - drop,
+        'dates': state['dates'][:-drop],
+        'close': state['close'][:-drop],
+        'vol_perc': state['vol_perc'][:-drop],
+    }
+
+
+def apply(symbol, new_rows, partition, verify_result=None):
+    """
+    Advance a symbol's state with the rows a sync just wrote.
+    new_rows: rows fetched this sync (may re-read the last cached day), partition: the merged partition
+    (used for the first build, or when revisions reach further back than REWIND_ROWS).
+    verify_result: None follows config.rolling_state_verify, True/False forces the check against a full recompute
+    Returns the derived frame for new_rows.
+    """
+    new_rows = new_rows.sort_values('date')
+    state = load_state(symbol)
+    if state is not None and len(new_rows) > 0:
+        state = _rewind(state, new_rows['date'].iloc[0])
+    if state is None:
+        full, state = _derive(_empty_state(), partition.sort_values('date'))
+        latest = full.iloc[-1].to_dict() if len(full) > 0 else None
+        derived = full.iloc[len(full) - len(new_rows):]
+    else:
+        derived, state_next = _derive(state, new_rows)
+        latest = derived.iloc[-1].to_dict() if len(derived) > 0 else state.get('latest')
+        state = state_next
+    state['latest'] = latest
+    _save_state(symbol, state)
+
+    if config.rolling_state_verify if verify_result is None else verify_result:
+        mismatches = verify(symbol, partition)
+        if len(mismatches) > 0:
+            print('Rolling state for {} differs from a full recompute, rebuilding:'.format(symbol))
+            print(mismatches.to_string(index=False))
+            drop_state(symbol)
+            apply(symbol, new_rows.iloc[0:0], partition, verify_result=False)
+    return derived
+
+
+def verify(symbol, partition, tolerance=1e-9):
+    """
+    Compare the persisted latest values of a symbol with a full recompute of its partition
+    (build_home_base + the registry indicator functions, no memo). Returns the mismatching columns, empty when they agree.
+    """
+    state = load_state(symbol)
+    full = indicators.build_home_base(partition.assign(symbol=symbol))
+    codes, _, pos = indicators.segment_positions(full['symbol'].to_numpy())
+    for name, windows in [('sma', SMA_WINDOWS), ('rolling_vol', VOL_WINDOWS)]:
+        indicator = indicators.INDICATORS[name]
+        for w in windows:
+            params = indicator.resolve({'window': w})
+            [values] = indicator.func(full, codes, pos, **dict(params))
+            full[indicator.column_names(params)[0]] = values
+    expected = full.iloc[-1] if len(full) > 0 else None
+    latest = None if state is None else state.get('latest')
+    rows = []
+    for column in LATEST_COLUMNS[1:]:
+        want = None if expected is None else expected[column]
+        got = None if latest is None else latest.get(column)
+        if column == 'date':
+            same = (want is None and got is None) or (want is not None and got is not None and pd.Timestamp(want) == pd.Timestamp(got))
+        else:
+            same = (want is None and got is None) or (want is not None and got is not None and
+                                                      np.allclose(want, got, rtol=tolerance, atol=tolerance, equal_nan=True))
+        if not same:
+            rows.append({'symbol': symbol, 'column': column, 'expected': want, 'state': got})
+    return pd.DataFrame(rows, columns=['symbol', 'column', 'expected', 'state'])
+
+
+def save_latest(symbols, removed=()):
+    """Rewrite the latest row table: refreshes `symbols`, drops `removed`"""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    path = os.path.join(STATE_DIR, LATEST_FILE)
+    latest = read_latest()
+    latest = latest[~latest['symbol'].isin(list(symbols) + list(removed))]
+    rows = []
+    for symbol in symbols:
+        state = load_state(symbol)
+        if state is not None and state.get('latest') is not None:
+            rows.append(dict(state['latest'], symbol=symbol))
+    if rows:
+        latest = pd.concat([latest, pd.DataFrame(rows)[LATEST_COLUMNS]], ignore_index=True)
+    latest.sort_values('symbol').reset_index(drop=True).to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+
+
+def read_latest(symbols=None):
+    """Latest derived row per symbol (LATEST_COLUMNS), None for every symbol"""
+    path = os.path.join(STATE_DIR, LATEST_FILE)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=LATEST_COLUMNS)
+    latest = pd.read_parquet(path)
+    if symbols is not None:
+        latest = latest[latest['symbol'].isin(list(symbols))].reset_index(drop=True)
+    return latest
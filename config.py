@@ -3,3 +3,30 @@
 creds_filepath = 'C:/Users/colto/Documents/creds.yaml'
 
 
+
+# key inside the creds yaml used for the shared database connection pool (bin/database.py)
+db_creds_key = 'austere-prod'
+
+# local parquet copy of dbo.symbol_quotes (bin/quote_cache.py)
+quote_cache_dir = 'db/quote_cache'
+
+# dtype of prices/indicators in the in-memory Home datasets: 'float64' or 'float32' (half the memory)
+home_float_dtype = 'float64'
+# memory budget (MB) for the derived Home datasets and memoized indicator columns, least recently used ones are evicted past it (bin/memory_budget.py)
+derived_cache_budget_mb = 1024
+
+# per symbol rolling indicator state, updated incrementally on every quote cache sync (bin/rolling_state.py)
+rolling_state_dir = 'db/rolling_state'
+# check every incremental update against a full recompute (slow, for debugging)
+rolling_state_verify = False
+
+# market data source for pages + ETL (bin/quote_source.py): 'live', 'record' or 'replay'
+# can be overridden with the STOCKFINDER_QUOTE_SOURCE env var
+quote_source = 'live'
+quote_recordings_dir = 'db/quote_recordings'
+
+# write-once intraday bars per (interval, symbol, session date) (bin/intraday_store.py)
+intraday_cache_dir = 'db/intraday_cache'
+
+# max points per plotly line trace, longer series are LTTB downsampled (bin/downsample.py)
+chart_max_points = 1500
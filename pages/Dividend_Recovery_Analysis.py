@@ -6,6 +6,12 @@ import plotly.express as px
 import numpy as np
 from plotly.subplots import make_subplots
 import db.stock_lists as stock_lists
+import bin.quote_source as quote_source
+import bin.dividend_store as dividend_store
+import bin.data_version as data_version
+import bin.intraday_store as intraday_store
+import bin.fetch_scheduler as fetch_scheduler
+import bin.distribution_stats as distribution_stats
 import io 
  # Often useful for more granular control
 
@@ -19,31 +25,49 @@ ticker_symbol = st.sidebar.text_input("Enter Stock Ticker (e.g., AAPL, MSFT)", "
 start_date = st.sidebar.date_input("Start Date", pd.to_datetime("2020-01-01"))
 end_date = st.sidebar.date_input("End Date", pd.to_datetime("today"))
 
-# Function to fetch data and perform analysis
-@st.cache_data(ttl='1 hour')
-def get_dividend_data(ticker, start, end):
+# Dividend Lists batch analysis: symbols analysed at once / analyses started per second
+BATCH_MAX_WORKERS = 8
+BATCH_REQUESTS_PER_SEC = 4.0
+
+# Data version tokens published by the ETL (bin/data_version.py), quotes + actions key the analysis cache
+@st.cache_data(ttl=60)
+def get_data_versions():
+    versions = data_version.get_data_versions()
+    return (versions[data_version.QUOTES], versions[data_version.ACTIONS])
+
+# Dividends + Open/Close prices: from the ETL tables when the symbol is loaded there, else from Yahoo
+def load_dividend_inputs(ticker, start, end):
+    # Fetch a bit more price data to ensure we have the day before the first ex-date (end is exclusive)
+    start_ts_for_history = pd.Timestamp(start) - pd.Timedelta(days=7)
+    end_ts_for_history = pd.Timestamp(end) + pd.Timedelta(days=1)
+    # Stored quotes keep the split basis of the day they were loaded while Yahoo restates dividends on every
+    # split, so a split on/after the window start can leave the two on different bases: use the live source then
+    if dividend_store.has_symbol(ticker) and dividend_store.splits(ticker, start=start_ts_for_history).empty:
+        dividends = dividend_store.dividends(ticker)
+        price_data = dividend_store.prices(ticker, start=start_ts_for_history, end=end_ts_for_history)
+        return dividends, price_data
+
+    source = quote_source.get_quote_source()
+
+    # Get historical dividends
+    dividends = source.dividends(ticker)
+    # IMMEDIATELY remove timezone from dividend index upon fetching
+    if not dividends.empty and dividends.index.tz is not None:
+        dividends.index = dividends.index.tz_localize(None) 
+    
+    # Fetch 'Open' and 'Close' prices
+    # Convert start/end from datetime.date to naive pd.Timestamp for yfinance.history
+    price_data = source.history(ticker, start=start_ts_for_history, end=end_ts_for_history, actions=False, auto_adjust=False) # actions=False to not get dividend/stock split columns here
+    
+    # IMMEDIATELY remove timezone from price_data index upon fetching
+    if not price_data.empty and price_data.index.tz is not None:
+        price_data.index = price_data.index.tz_localize(None)
+    return dividends, price_data
+
+# Function to fetch data and perform analysis (uncached, safe to run from worker threads)
+def compute_dividend_data(ticker, start, end):
     try:
-        stock = yf.Ticker(ticker)
-        
-        # Get historical dividends
-        dividends = stock.dividends
-        # IMMEDIATELY remove timezone from dividend index upon fetching
-        if not dividends.empty and dividends.index.tz is not None:
-            dividends.index = dividends.index.tz_localize(None) 
-        
-        # Get historical stock prices (using 'Close' price)
-        # Fetch a bit more data to ensure we have the day before the first ex-date
-        # Convert start/end from datetime.date to naive pd.Timestamp for yfinance.history
-        # This ensures yfinance receives naive Timestamps for its range
-        start_ts_for_history = pd.Timestamp(start) - pd.Timedelta(days=7)
-        end_ts_for_history = pd.Timestamp(end) + pd.Timedelta(days=1)
-        
-        # Fetch 'Open' and 'Close' prices
-        price_data = stock.history(start=start_ts_for_history, end=end_ts_for_history, actions=False, auto_adjust=False) # actions=False to not get dividend/stock split columns here
-        
-        # IMMEDIATELY remove timezone from price_data index upon fetching
-        if not price_data.empty and price_data.index.tz is not None:
-            price_data.index = price_data.index.tz_localize(None)
+        dividends, price_data = load_dividend_inputs(ticker, start, end)
 
         # Now, use naive Timestamps for filtering the dividends DataFrame
         # Both dividends.index and the comparison dates (start_ts, end_ts) are now naive
@@ -57,51 +81,48 @@ def get_dividend_data(ticker, start, end):
         if price_data.empty:
             return None, "No price data found for the selected period."
 
-        results = []
-        for ex_date, dividend_amount in dividends.items():
-            # 'ex_date' here is already a naive pd.Timestamp because dividends.index was localized
-            
-            # Calculate day before ex-date (will also be naive pd.Timestamp)
-            day_before_ex_date = ex_date - pd.Timedelta(days=1)
-            
-            # Find the actual trading day before the ex-date if the day before is a weekend/holiday
-            # Now, both day_before_ex_date and price_data.index are naive Timestamps, allowing direct comparison
-            while day_before_ex_date not in price_data.index and day_before_ex_date >= price_data.index.min():
-                day_before_ex_date -= pd.Timedelta(days=1)
-            
-            # Ensure the calculated dates actually exist in the price data index
-            # Both are now naive Timestamps, so direct lookup should work
-            if day_before_ex_date in price_data.index and ex_date in price_data.index:
-                price_day_before_close = price_data.loc[day_before_ex_date]['Close']
-                price_on_ex_date_open = price_data.loc[ex_date]['Open']
-                price_on_ex_date_close = price_data.loc[ex_date]['Close']
-                
-                # Change based on previous day's close vs. ex-date open
-                price_change_at_open = price_on_ex_date_open - price_day_before_close
-                # Change based on previous day's close vs. ex-date close
-                price_change_at_close = price_on_ex_date_close - price_day_before_close
-
-                percentage_change_at_open = (price_change_at_open / price_day_before_close) * 100 if price_day_before_close != 0 else 0
-                percentage_change_at_close = (price_change_at_close / price_day_before_close) * 100 if price_day_before_close != 0 else 0
-
-                results.append({
-                    "Ex-Dividend Date": ex_date.date(), # Store as plain Python date object for clarity in DataFrame
-                    "Dividend Amount": dividend_amount,
-                    "Price Day Before Close": price_day_before_close,
-                    "Price On Ex-Date Open": price_on_ex_date_open,
-                    "Price On Ex-Date Close": price_on_ex_date_close,
-                    "Price Change Open (Absolute)": price_change_at_open,
-                    "Price Change Close (Absolute)": price_change_at_close,
-                    "Price Change Open (%)": percentage_change_at_open,
-                    "Price Change Close (%)": percentage_change_at_close, # Corrected key
-                    "Difference from Dividend (Open vs Dividend)": price_change_at_open + dividend_amount,
-                    "Difference from Dividend (Close vs Dividend)": price_change_at_close + dividend_amount
-                })
-        
-        if not results:
+        # Align every ex-date with its prior session in one as-of join against the (sorted) price index:
+        # prior session = last trading day on/before ex_date - 1 day, the ex-date itself must be a trading day
+        if not price_data.index.is_monotonic_increasing:
+            price_data = price_data.sort_index()
+        sessions = price_data.index
+        ex_dates = dividends.index
+        prior_pos = sessions.searchsorted(ex_dates - pd.Timedelta(days=1), side='right') - 1
+        ex_pos = sessions.searchsorted(ex_dates, side='left')
+        ex_found = ex_pos < len(sessions)
+        ex_found[ex_found] = sessions[ex_pos[ex_found]] == ex_dates[ex_found]
+        matched = ex_found & (prior_pos >= 0)
+
+        if not matched.any():
             return None, "Could not find corresponding price data for all ex-dividend dates within the selected range."
 
-        df_results = pd.DataFrame(results)
+        open_prices = price_data['Open'].to_numpy()
+        close_prices = price_data['Close'].to_numpy()
+        dividend_amount = dividends.to_numpy()[matched]
+        price_day_before_close = close_prices[prior_pos[matched]]
+        price_on_ex_date_open = open_prices[ex_pos[matched]]
+        price_on_ex_date_close = close_prices[ex_pos[matched]]
+
+        # Change based on previous day's close vs. ex-date open / close
+        price_change_at_open = price_on_ex_date_open - price_day_before_close
+        price_change_at_close = price_on_ex_date_close - price_day_before_close
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percentage_change_at_open = np.where(price_day_before_close != 0, (price_change_at_open / price_day_before_close) * 100, 0)
+            percentage_change_at_close = np.where(price_day_before_close != 0, (price_change_at_close / price_day_before_close) * 100, 0)
+
+        df_results = pd.DataFrame({
+            "Ex-Dividend Date": ex_dates[matched].date, # Store as plain Python date object for clarity in DataFrame
+            "Dividend Amount": dividend_amount,
+            "Price Day Before Close": price_day_before_close,
+            "Price On Ex-Date Open": price_on_ex_date_open,
+            "Price On Ex-Date Close": price_on_ex_date_close,
+            "Price Change Open (Absolute)": price_change_at_open,
+            "Price Change Close (Absolute)": price_change_at_close,
+            "Price Change Open (%)": percentage_change_at_open,
+            "Price Change Close (%)": percentage_change_at_close,
+            "Difference from Dividend (Open vs Dividend)": price_change_at_open + dividend_amount,
+            "Difference from Dividend (Close vs Dividend)": price_change_at_close + dividend_amount
+        })
         # Some custom calcs 
         df_results["inv(Dividend Amount)"] =  df_results["Dividend Amount"]*(-1) 
 
@@ -111,13 +132,54 @@ def get_dividend_data(ticker, start, end):
     except Exception as e:
         return None, f"Error fetching data: {e}"
 
+# versions: get_data_versions() token, a new ETL load invalidates the cached results
+@st.cache_data(ttl='1 hour')
+def get_dividend_data(ticker, start, end, versions=None):
+    return compute_dividend_data(ticker, start, end)
+
+# Columns the batch screen summarizes, with their short names in the summary table
+SUMMARY_METRICS = {
+    "Difference from Dividend (Open vs Dividend)": "open",
+    "Difference from Dividend (Close vs Dividend)": "close",
+}
+
+def summarize_dividend_data(analyses):
+    # One summary row per symbol: n, mean/std, one-sample t-stat (mean vs 0) and Shapiro-Wilk p of each metric,
+    # all symbols x metrics computed in one batched pass (bin/distribution_stats.py)
+    frames = {ticker: df for ticker, (df, error_message) in analyses.items() if not error_message}
+    stats = distribution_stats.describe_columns(frames, list(SUMMARY_METRICS))
+    rows = []
+    for ticker, (df, error_message) in analyses.items():
+        row = {"Symbol": ticker, "n": 0 if df is None else len(df), "Error": error_message}
+        for column, name in SUMMARY_METRICS.items():
+            metric = stats.loc[[(ticker, column)]].iloc[0] if ticker in frames else None
+            for stat in ["mean", "std", "t_stat", "shapiro_p"]:
+                row[f"{stat}_{name}"] = np.nan if metric is None else metric[stat]
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+# Batch mode for the Dividend Lists tab: every symbol's analysis computed concurrently, one summary row each
+# Returns (summary DataFrame, {symbol: (df_dividend_analysis, error_message)})
+@st.cache_data(ttl='1 hour')
+def get_dividend_batch(tickers, start, end, versions=None):
+    scheduler = fetch_scheduler.FetchScheduler(rate=BATCH_REQUESTS_PER_SEC, max_concurrency=BATCH_MAX_WORKERS, max_retries=0)
+
+    def fetch(ticker):
+        return (ticker, compute_dividend_data(ticker, start, end)), []
+
+    results, failures = scheduler.run(list(tickers), fetch)
+    analyses = dict(results)
+    for ticker, error in failures:
+        analyses[ticker] = (None, f"Error fetching data: {error}")
+    analyses = {ticker: analyses[ticker] for ticker in tickers}
+    return summarize_dividend_data(analyses), analyses
+
 # BOX PLOTS FOr absolute Price Change at Open vs Close
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go # Import graph_objects for adding traces
 import streamlit as st
 import io
-from scipy.stats import t, shapiro # Import t for Student's t-distribution calculations
 
 def box_plot_compare(df, col1, col2, title):
     """
@@ -169,28 +231,28 @@ def box_plot_compare(df, col1, col2, title):
     # Add a horizontal line at y=0
     fig.add_hline(y=0, line_dash="dot", line_color="red", annotation_text="", opacity=0.25, annotation_position="bottom right")
 
-    # --- Calculate and Add Normal Distribution Metrics to the Plot ---
+    # --- Add Normal Distribution Metrics to the Plot ---
+    # All statistics come precomputed from the batched engine (bin/distribution_stats.py), memoized per input
     metrics_to_analyze = {
         "At Open": df[col1],
         "At Close": df[col2],
         "Close - Open Difference": df['Difference']
     }
+    metric_stats = distribution_stats.describe(metrics_to_analyze)
+    std_dev_labels = [
+        '-3σ', '-2σ', '-1σ',
+        '+1σ', '+2σ', '+3σ'
+    ]
 
-    for original_col_name, data_series in metrics_to_analyze.items():
-        # Get the corresponding label used in the plot
-        metric_label = metric_labels[original_col_name] if original_col_name in metric_labels else original_col_name
-
-        mean_val = data_series.mean()
-        std_val = data_series.std() # Sample standard deviation
-
-        # Find the x-axis position for the current metric label
-        x_pos = metric_label # Use the label directly as x-coordinate for categorical axis
+    for metric_label, stats_row in metric_stats.iterrows():
+        # Use the label directly as x-coordinate for categorical axis
+        x_pos = metric_label
 
         # Add mean marker
         fig.add_trace(
             go.Scatter(
                 x=[x_pos],
-                y=[mean_val],
+                y=[stats_row['mean']],
                 mode='markers',
                 marker=dict(symbol='star', size=12, color='black'),
                 name=f'{metric_label} Mean',
@@ -198,34 +260,8 @@ def box_plot_compare(df, col1, col2, title):
             )
         )
 
-        # Determine the standard deviation to use for plotting the +/- sigma points.
-        # This will be the sample standard deviation, potentially scaled if n-1 > 2
-        # to reflect the wider tails of a t-distribution.
-        std_for_sigma_points = std_val # Default to sample standard deviation
-
-        n = len(data_series)
-        if n - 1 > 2: # Degrees of freedom must be > 2 for the t-distribution variance to be finite
-            df_for_std_calc = n - 1
-            # The variance of a standard t-distribution is df / (df - 2).
-            # We scale the *sample* standard deviation by the ratio of the
-            # theoretical t-distribution's standard deviation (sqrt(df/(df-2)))
-            # to the standard deviation of a standard normal distribution (1).
-            # This makes the displayed sigma points wider for smaller sample sizes (smaller df),
-            # reflecting the heavier tails of the t-distribution.
-            t_dist_scale_factor = ((df_for_std_calc) / (df_for_std_calc - 2))**0.5
-            std_for_sigma_points = std_val * t_dist_scale_factor
-
-        # Add standard deviation markers using std_for_sigma_points
-        std_dev_points = [
-            mean_val - 3 * std_for_sigma_points, mean_val - 2 * std_for_sigma_points, mean_val - std_for_sigma_points,
-            mean_val + std_for_sigma_points, mean_val + 2 * std_for_sigma_points, mean_val + 3 * std_for_sigma_points
-        ]
-        std_dev_labels = [
-            '-3σ', '-2σ', '-1σ',
-            '+1σ', '+2σ', '+3σ'
-        ]
-
-        for i, val in enumerate(std_dev_points):
+        # Add standard deviation markers: sample std, widened to the t-distribution's sd when n-1 > 2
+        for i, val in enumerate(distribution_stats.sigma_points(stats_row)):
             fig.add_trace(
                 go.Scatter(
                     x=[x_pos],
@@ -237,30 +273,12 @@ def box_plot_compare(df, col1, col2, title):
                 )
             )
 
-        # --- Calculate and Add Cumulative Probability (P(X > 0)) using Student's t-distribution ---
-        prob_greater_than_zero_text = ""
-        if std_val > 0 and n > 1: # Ensure std_dev is not 0 and enough data for df > 0
-            df_t = n - 1 # Degrees of freedom for t-distribution
-            std_err = std_val / (n**0.5) # Standard error of the mean
-
-            if std_err == 0: # Handle cases where std_err might be 0 (e.g., if std_val was tiny)
-                if mean_val > 0:
-                    prob_greater_than_zero = 1.0
-                else:
-                    prob_greater_than_zero = 0.0
-            else:
-                t_statistic = (0 - mean_val) / std_val # std error means that X is the mean not X bar, use std_val for predictive statistics 
-                prob_greater_than_zero = 1 - t.cdf(t_statistic, df=df_t)
-
-            prob_greater_than_zero_text = f'P(X > 0) (t-dist): {prob_greater_than_zero:.2%}'
+        # --- Add Cumulative Probability (P(X > 0)) using Student's t-distribution ---
+        if stats_row['std'] > 0 and stats_row['n'] > 1:
+            prob_greater_than_zero_text = f"P(X > 0) (t-dist): {stats_row['p_gt_zero']:.2%}"
         else:
-            # Handle cases where std_dev is 0 or not enough data for t-dist (n <= 1)
-            if mean_val > 0:
-                prob_greater_than_zero_text = 'P(X > 0): 100.00%'
-            elif mean_val == 0:
-                prob_greater_than_zero_text = 'P(X > 0): 0.00%'
-            else:
-                prob_greater_than_zero_text = 'P(X > 0): 0.00%'
+            # std_dev is 0 or not enough data for t-dist (n <= 1)
+            prob_greater_than_zero_text = f"P(X > 0): {stats_row['p_gt_zero']:.2%}"
 
         # Add P(X > 0) annotation
         fig.add_annotation(
@@ -279,15 +297,12 @@ def box_plot_compare(df, col1, col2, title):
         )
 
         # --- Add Shapiro-Wilk Test for Normality ---
-        shapiro_test_text = ""
-        if n >= 3: # Shapiro-Wilk test requires at least 3 data points
-            try:
-                shapiro_stat, shapiro_p = shapiro(data_series)
-                shapiro_test_text = f'Shapiro-Wilk: p={shapiro_p:.3f}'
-            except Exception as e:
-                shapiro_test_text = f'Shapiro-Wilk: Error ({e})'
-        else:
+        if stats_row['n'] < distribution_stats.SHAPIRO_MIN_N:
             shapiro_test_text = 'Shapiro-Wilk: N < 3'
+        elif np.isnan(stats_row['shapiro_p']):
+            shapiro_test_text = 'Shapiro-Wilk: Error'
+        else:
+            shapiro_test_text = f"Shapiro-Wilk: p={stats_row['shapiro_p']:.3f}"
 
         # Add Shapiro-Wilk annotation
         fig.add_annotation(
@@ -313,51 +328,24 @@ import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
 
+# Intraday bars per session date from the write-once store (bin/intraday_store.py), missing sessions fetched in one request
+# Returns ({session: bars}, failures)
 @st.cache_data(ttl='6 hours')
-def get_intraday_stock_data(ticker: str, start_date, end_date, interval: str = "60m") -> pd.DataFrame:
+def get_intraday_sessions(ticker: str, sessions: tuple, interval: str = "60m"):
+    return intraday_store.get_sessions(ticker, sessions, interval)
+
+def get_intraday_stock_data(ticker: str, start_date, end_date, interval: str = "60m", session_bars=None) -> pd.DataFrame:
+    # session_bars: get_intraday_sessions() result covering the window, fetched here when not given
     try:
-        # Convert date strings to datetime objects
-        start_dt = start_date # Assuming start_date is already a datetime object
-        end_dt = end_date # Assuming end_date is already a datetime object
-
-        # Calculate the difference in days
-        delta = end_dt - start_dt
-        period_days = delta.days + 1
-
-        if interval == "1m" and period_days > 7:
-            print(f"Warning: For '1m' interval, yfinance typically provides data for the last 7 days only.")
-            print(f"Adjusting period to 7 days from {end_date}.")
-            adjusted_start_dt = end_dt - timedelta(days=6)
-            # Ensure adjusted_start_dt is not before the original start_dt
-            if adjusted_start_dt < start_dt:
-                adjusted_start_dt = start_dt
-            start_date_yf = adjusted_start_dt.strftime("%Y-%m-%d")
-        elif interval in ["5m", "15m", "30m", "60m", "90m", "1h"] and period_days > 60:
-            print(f"Warning: For '{interval}' interval, yfinance typically provides data for up to 60 days.")
-            print(f"Adjusting period to 60 days from {end_date}.")
-            adjusted_start_dt = end_dt - timedelta(days=59)
-            if adjusted_start_dt < start_dt:
-                adjusted_start_dt = start_dt
-            start_date_yf = adjusted_start_dt.strftime("%Y-%m-%d")
-        else:
-            start_date_yf = start_date.strftime("%Y-%m-%d") # Ensure this is a string for yfinance
-
-        # Fetch data
-        data = yf.download(
-            ticker,
-            start=start_date_yf,
-            end=(end_dt + timedelta(days=1)).strftime("%Y-%m-%d"), # yfinance `end` is exclusive
-            interval=interval,
-            auto_adjust=True  # Automatically adjust Open, High, Low, Close for dividends and splits
-        )
-        if isinstance(data.columns, pd.MultiIndex):
-            # This handles cases where yfinance might return (Ticker, Column_Name)
-            # We want to keep only the Column_Name
-            data.columns = [col[0] if isinstance(col, tuple) else col for col in data.columns]
-        
-        if data.empty:
+        start_ts, end_ts = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        if session_bars is None:
+            session_bars, _ = get_intraday_sessions(ticker, tuple(pd.bdate_range(start_ts, end_ts)), interval)
+        frames = [bars for session, bars in sorted(session_bars.items()) if start_ts <= session <= end_ts and not bars.empty]
+        if not frames:
             print(f"No data found for {ticker} from {start_date} to {end_date} with interval {interval}.")
             return pd.DataFrame()
+        data = pd.concat(frames)
+        data.index.name = data.index.name or 'Datetime'
         
         # --- Add the new column for relative difference ---
         if 'Open' in data.columns and not data['Open'].empty:
@@ -539,7 +527,7 @@ def generate_hourly_daily_distribution_plot(df_high_res, yfield='Open_Relative_t
 tab_single, tab_multi = st.tabs(['Single Stock Analysis', 'Dividend Lists'])
 
 with tab_single:
-    df_dividend_analysis, error_message = get_dividend_data(ticker_symbol, start_date, end_date)
+    df_dividend_analysis, error_message = get_dividend_data(ticker_symbol, start_date, end_date, get_data_versions())
     if error_message:
         st.error(error_message)
     elif df_dividend_analysis is not None and not df_dividend_analysis.empty:
@@ -622,6 +610,14 @@ with tab_single:
         # compare it directly with the 'two_years_ago' date.
         ex_dates_list = [date for date in ex_dates_list if date >= two_years_ago]
 
+        # Every session around every ex-date in one call: stored sessions are read from disk, the rest fetched concurrently
+        intraday_sessions = tuple(sorted({session for sdate in ex_dates_list
+                                          for session in pd.bdate_range(sdate + timedelta(days=-1), sdate + timedelta(days=1))}))
+        session_bars, intraday_failures = get_intraday_sessions(ticker_symbol, intraday_sessions)
+        if len(intraday_failures) > 0:
+            st.warning(f"Intraday bars could not be loaded for {len(intraday_failures)} session(s).")
+            st.dataframe(intraday_failures, hide_index=True)
+
         # Initialize an empty list to store DataFrames
         all_high_res_dfs = []
 
@@ -629,7 +625,8 @@ with tab_single:
             sdate_str = sdate_ts  #.strftime('%Y-%m-%d') 
             
             try:
-                df_high_res_i = get_intraday_stock_data(ticker_symbol, sdate_str + timedelta(days=-1), sdate_str + timedelta(days=1))
+                df_high_res_i = get_intraday_stock_data(ticker_symbol, sdate_str + timedelta(days=-1), sdate_str + timedelta(days=1),
+                                                        session_bars=session_bars)
                 df_high_res_i['sort_field'] = range(len(df_high_res_i))  # Add a sort field for consistent ordering
 
 
@@ -675,14 +672,24 @@ with tab_multi:
     selected_stocks = stock_lists.nav_erosion_stocks[choose_stock_list]
     lc1,lc2,lc3 = st.columns([1,1,2])
     if lc1.button("Analyze Selected Stocks"):
-        for stock in selected_stocks:
-            df_dividend_analysis, error_message = get_dividend_data(stock, start_date, end_date)
+        st.session_state.dividend_batch = tuple(selected_stocks)
+    lc2.link_button("Go to Yield Max Schedule", "https://www.yieldmaxetfs.com/distribution-schedule/")
+
+    batch_stocks = st.session_state.get('dividend_batch')
+    if batch_stocks:
+        df_summary, batch_analyses = get_dividend_batch(batch_stocks, start_date, end_date, get_data_versions())
+        for stock, error_message in zip(df_summary["Symbol"], df_summary["Error"]):
             if error_message:
                 st.error(f"Error for {stock}: {error_message}")
-            elif df_dividend_analysis is not None and not df_dividend_analysis.empty:
-                box_plot_compare(df_dividend_analysis, "Difference from Dividend (Open vs Dividend)", 
-                            "Difference from Dividend (Close vs Dividend)", 
-                            f"[{stock}]Comparison of Price Change + Dividend at Open vs. Close")
-            else:
-                st.info(f"No dividend data found for {stock} in the selected period.")
-    lc2.link_button("Go to Yield Max Schedule", "https://www.yieldmaxetfs.com/distribution-schedule/") 
+        # Sortable cross-symbol summary (click a column header to sort)
+        st.dataframe(df_summary[df_summary["Error"].isna()].drop(columns="Error"), hide_index=True, use_container_width=True,
+                     column_config={col: st.column_config.NumberColumn(format="%.3f") for col in df_summary.columns
+                                    if col not in ("Symbol", "n", "Error")})
+        # Charts only for the symbols asked for
+        chart_stocks = st.multiselect("Show charts for", [s for s, e in zip(df_summary["Symbol"], df_summary["Error"]) if not e])
+        for stock in chart_stocks:
+            df_dividend_analysis, _ = batch_analyses[stock]
+            box_plot_compare(df_dividend_analysis.copy(), "Difference from Dividend (Open vs Dividend)", 
+                        "Difference from Dividend (Close vs Dividend)", 
+                        f"[{stock}]Comparison of Price Change + Dividend at Open vs. Close")
+ 
@@ -2,6 +2,7 @@ import streamlit as st
 import yfinance as yf
 import pandas as pd
 import plotly.express as px
+import bin.quote_source as quote_source
 
 # Set Streamlit page configuration
 st.set_page_config(layout="wide", page_title="Stock Comparator")
@@ -38,11 +39,11 @@ if tickers:
 
     for ticker_symbol in tickers:
         try:
-            # Create a Ticker object
-            ticker = yf.Ticker(ticker_symbol)
+            # Market data source (live yfinance, recorder or replay)
+            source = quote_source.get_quote_source()
 
             # --- Fetch Current P/E Ratio ---
-            info = ticker.info
+            info = source.info(ticker_symbol)
             if 'trailingPE' in info:
                 current_pe_ratios[ticker_symbol] = info['trailingPE']
             else:
@@ -51,7 +52,7 @@ if tickers:
 
             # --- Fetch Historical Price Data ---
             # Fetch historical data (e.g., last 2 years to ensure enough EPS data)
-            hist_data = ticker.history(period="2y")
+            hist_data = source.history(ticker_symbol, period="2y")
             if hist_data.empty:
                 st.warning(f"No historical price data found for {ticker_symbol}. Please check the ticker symbol.")
                 continue # Skip to next ticker if no price data
@@ -70,7 +71,7 @@ if tickers:
             # --- Calculate Historical P/E Ratio ---
             # Fetch quarterly financial statements (Income Statement)
             # This is often more reliable for EPS than quarterly_earnings
-            quarterly_financials = ticker.quarterly_financials
+            quarterly_financials = source.quarterly_financials(ticker_symbol)
             
             if quarterly_financials is not None and not quarterly_financials.empty:
                 # Ensure 'Date' is datetime and sort by date descending
@@ -11,63 +11,43 @@ import plotly
 import plotly.express as px
 from datetime import date, timedelta
 import pandasql as ps 
-import psycopg2
-import yaml
 import config
+import bin.database as database
+import bin.data_version as data_version
+import bin.quote_source as quote_source
+import bin.etl_runner as etl_runner
 
 # Page configurations 
 st.set_page_config(layout="wide")
 
-# YAML FILE LOCATION: 
-with open(config.creds_filepath, "r") as yaml_file:
-    creds = yaml.safe_load(yaml_file)
-
 
 # Load existing symbols 
 def getSymbols():
-    # Establish a connection to the PostgreSQL database
-    conn = psycopg2.connect(
-    dbname=creds['austere-prod']['dbname'],
-    user=creds['austere-prod']['user'],
-    password=creds['austere-prod']['password'],
-    host=creds['austere-prod']['host'],
-    port=creds['austere-prod']['port']
-    )
     # get symbols of interest and their max date in dbo.symbol_quotes 
     query = """
         SELECT symbol, "type", subtype, exchange, category, description, "comment", active
         FROM dbo.symbols;
     """
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = database.read_sql(query)
     return df
 
 
 def is_valid_symbol(symbol):
     try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(period="1d")  # Fetch data for one day
+        data = quote_source.get_quote_source().history(symbol, period="1d")  # Fetch data for one day
         return not data.empty
     except ValueError:
         return False
 
 def insertSymbolToDatabase(symbol, desc, comment, type):
     if is_valid_symbol(symbol):
-        conn = psycopg2.connect(
-            dbname=creds['austere-prod']['dbname'],
-            user=creds['austere-prod']['user'],
-            password=creds['austere-prod']['password'],
-            host=creds['austere-prod']['host'],
-            port=creds['austere-prod']['port']
-        )
-        sql = f"""
+        sql = """
             INSERT INTO dbo.symbols (symbol, description, comment, type)
-                select '{symbol}', '{desc}', '{comment}', '{type}'
+                select %s, %s, %s, %s
             ; """
-        cursor = conn.cursor()
-        cursor.execute(sql)
-        conn.commit()
-        conn.close()
+        with database.get_cursor() as cursor:
+            cursor.execute(sql, (symbol, desc, comment, type))
+            data_version.bump(cursor, data_version.SYMBOLS)
         st.write(f'${symbol} written to database.')
     else: 
         st.write(symbol + ' is not valid, only yahoo finance symbols are valid.')
@@ -75,21 +55,13 @@ def insertSymbolToDatabase(symbol, desc, comment, type):
 
 def addSymbolToWatchlist(symbol, watchlist):
     if is_valid_symbol(symbol):
-        conn = psycopg2.connect(
-            dbname=creds['austere-prod']['dbname'],
-            user=creds['austere-prod']['user'],
-            password=creds['austere-prod']['password'],
-            host=creds['austere-prod']['host'],
-            port=creds['austere-prod']['port']
-        )
-        sql = f"""
+        sql = """
         insert into dbo.watchlistsymbols (watchlist_id, symbol)
-            select (select id from dbo.watchlists where shortname = '{watchlist}'), '{symbol}'
+            select (select id from dbo.watchlists where shortname = %s), %s
             ; """
-        cursor = conn.cursor()
-        cursor.execute(sql)
-        conn.commit()
-        conn.close()
+        with database.get_cursor() as cursor:
+            cursor.execute(sql, (watchlist, symbol))
+            data_version.bump(cursor, data_version.SYMBOLS)
         st.write(f'${symbol} written to database.')
     else: 
         st.write(symbol + ' is not valid, only yahoo finance symbols are valid.')
@@ -116,10 +88,44 @@ if submitted:
         st.write('Symbol is required.')
 
 if st.button("Refresh all data [Admin Only functionality]"):
-    from ETL import load_dbo_symbol_quotes
-    load_dbo_symbol_quotes.main()
-    st.write('All symbols refreshed:')
-    st.dataframe(load_dbo_symbol_quotes.getSymbolList())
+    # ETL runs in the background, only one load can be active at a time
+    run_id = etl_runner.start_run()
+    if run_id is None:
+        st.warning('A data refresh is already running.')
+    else:
+        st.write(f'Started data refresh (run {run_id}).')
+
+# Progress of the background ETL (current or last run in this process)
+def showEtlProgress():
+    progress = etl_runner.get_progress()
+    if progress is None:
+        return
+    pc1, pc2, pc3, pc4 = st.columns(4)
+    pc1.metric("Refresh status", f"{progress['status']} ({progress['stage']})")
+    pc2.metric("Symbols done", f"{progress['symbols_done']}/{progress['symbols_total']}")
+    pc3.metric("Rows loaded", progress['rows_loaded'])
+    pc4.metric("Errors", progress['errors'])
+    if progress['message']:
+        st.error(progress['message'])
+
+# Polled every 2s only while a run is active, once it ends one full rerun switches back to the static view
+@st.fragment(run_every=2)
+def pollEtlProgress():
+    showEtlProgress()
+    if not etl_runner.is_running():
+        st.rerun()
+
+if etl_runner.is_running():
+    pollEtlProgress()
+else:
+    showEtlProgress()
+
+with st.expander("Data refresh history"):
+    st.dataframe(etl_runner.get_run_history(), hide_index=True)
+
+
+with st.expander("Database connection pool stats"):
+    st.json(database.pool_stats())
 
 
 st.write('##### Create watchlist')
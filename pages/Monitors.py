@@ -4,6 +4,9 @@ import plotly.graph_objects as go
 import pandas as pd
 from datetime import datetime, timedelta
 import bin.alerts as alerts  
+import bin.quote_source as quote_source
+import bin.downsample as downsample
+import config
 import pytz 
 
 # Session vars: (these are preserved between runs)
@@ -41,21 +44,21 @@ def get_stock_data_high_resolution(ticker_symbol, n_days, interval='1m'):
     historical_data = pd.DataFrame()
 
 
-    # Create a Ticker object
-    stock = yf.Ticker(ticker_symbol)
+    # Market data source (live yfinance, recorder or replay)
+    source = quote_source.get_quote_source()
 
     # Get current info, including real-time price
     # 'regularMarketPrice' is generally the most up-to-date price
-    info = stock.info
+    info = source.info(ticker_symbol)
     current_price = info.get('regularMarketPrice')
 
     # Fallback for current price if 'regularMarketPrice' is not available
     if not current_price:
         # Try to get the latest intraday close for the current day
-        hist_current_day = stock.history(period='1d', interval=interval)
+        hist_current_day = source.history(ticker_symbol, period='1d', interval=interval)
         if hist_current_day.empty:
             # If intraday for today is empty, fall back to daily close
-            hist_current_day = stock.history(period='1d', interval='1d')
+            hist_current_day = source.history(ticker_symbol, period='1d', interval='1d')
         if not hist_current_day.empty:
             current_price = hist_current_day['Close'].iloc[-1]
         else:
@@ -88,7 +91,7 @@ def get_stock_data_high_resolution(ticker_symbol, n_days, interval='1m'):
         else: period_str = 'max' # Fetch maximum available history
 
     # Fetch historical data with the specified interval and period
-    historical_data = yf.download(ticker_symbol, period=period_str, interval=interval)
+    historical_data = source.download(ticker_symbol, period=period_str, interval=interval)
     # Remove weird column headers 
     if isinstance(historical_data.columns, pd.MultiIndex):
         # This handles cases where yfinance might return (Ticker, Column_Name)
@@ -134,9 +137,11 @@ def plot_stock_data(historical_data, ticker_symbol, company_name, lower_limit, u
 
     fig = go.Figure()
 
+    # 1m bars over several days are LTTB downsampled to chart_max_points (sidebar toggle for full resolution)
+    x, y = downsample.lttb(historical_data.index, historical_data['Close'], chart_max_points)
     fig.add_trace(go.Scatter(
-        x=historical_data.index, 
-        y=historical_data['Close'], 
+        x=x, 
+        y=y, 
         mode='lines', 
         name=f'{ticker_symbol} Closing Price',
         line=dict(color='blue', width=2)
@@ -279,6 +284,8 @@ st.sidebar.header("Input Parameters")
 #ticker_input = st.sidebar.text_input("Enter Stock Ticker (e.g., AAPL, MSFT, GOOGL)", "MSTY").upper()
 #ticker_input = st.sidebar.text_input("Enter Stock Ticker2 (e.g., AAPL, MSFT, GOOGL)", "MSTY").upper()
 num_days_input = st.sidebar.slider("Number of Historical Days to Show", 1, 90, 5)
+full_resolution = st.sidebar.checkbox('Full resolution charts', value=False)
+chart_max_points = None if full_resolution else config.chart_max_points
 
 # Loop through and display ACTIVE alerts only 
 top_row,top_row_c2 = st.columns(2)
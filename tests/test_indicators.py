@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import bin.indicators as indicators
+import bin.memory_budget as memory_budget
+from bin.quote_index import QuoteIndex
+
+
+def make_quotes(symbols, days, start='2020-01-01', seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=days)
+    frames = []
+    for symbol in symbols:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+        frames.append(pd.DataFrame({'symbol': symbol, 'date': dates, 'open': close, 'high': close * 1.01,
+                                    'low': close * 0.99, 'close': close, 'volume': 1000.0}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_compute_wider_window_same_version_misses_memo():
+    # same data version and first date, longer segment: the memoized shorter segment must not be reused
+    cache = memory_budget.DatasetCache(64)
+    quotes = make_quotes(['AAA', 'BBB'], 150)
+    short = QuoteIndex(indicators.build_home_base(quotes[quotes['date'] < quotes['date'].iloc[100]]))
+    long = QuoteIndex(indicators.build_home_base(quotes))
+    versions = {'AAA': 1, 'BBB': 1}
+    request = [('sma', {'window': 5})]
+
+    assert len(indicators.compute(short, request, data_versions=versions, cache=cache)) == 200
+    result = indicators.compute(long, request, data_versions=versions, cache=cache)
+
+    expected = long.frame.groupby('symbol', observed=True)['close'].transform(lambda x: x.rolling(5).mean())
+    assert len(result) == 300
+    np.testing.assert_allclose(result['_5day_SMA'].to_numpy(), expected.to_numpy(), equal_nan=True)
+
+
+def test_ema_rsi_match_pandas_per_symbol():
+    quotes = make_quotes(['AAA', 'BBB', 'CCC'], 80, seed=1)
+    quotes.loc[130, 'close'] = np.nan  # a gap inside BBB goes through the pandas fallback
+    frame = indicators.build_home_base(quotes)
+    codes, _, pos = indicators.segment_positions(frame['symbol'].to_numpy())
+    [ema] = indicators.ema(frame, codes, pos, column='close', span=10)
+    [rsi] = indicators.rsi(frame, codes, pos, period=14)
+
+    grouped = frame.groupby('symbol', observed=True, sort=False)['close']
+    expected_ema = grouped.transform(lambda x: x.ewm(span=10, adjust=False).mean())
+    delta = frame['close'] - grouped.shift()
+    smooth = lambda x: x.ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+    gain = delta.where(~(delta < 0), 0.0).groupby(frame['symbol'], observed=True, sort=False).transform(smooth)
+    loss = (-delta).where(~(delta > 0), 0.0).groupby(frame['symbol'], observed=True, sort=False).transform(smooth)
+    expected_rsi = np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+
+    np.testing.assert_allclose(ema, expected_ema.to_numpy(), rtol=1e-10, equal_nan=True)
+    np.testing.assert_allclose(rsi, expected_rsi, rtol=1e-10, equal_nan=True)